@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+
+from block_detector import SourceBlocked
+from scheduler import WarmBrowser
+from scraper import SCRAPERS, get_scraper, source_label
+
+
+class ResultCache:
+    """In-memory TTL cache of finished (source, keyword, pages) searches, evicting least recently used."""
+
+    def __init__(self, ttl=900, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored, items = entry
+            if time.time() - stored > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return items
+
+    def put(self, key, items):
+        with self.lock:
+            self.entries[key] = (time.time(), items)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class BrowserPool:
+    """
+    Fixed set of worker threads, each owning a warm browser (Playwright's
+    sync API is bound to its thread). Jobs are callables taking the browser;
+    their result is delivered to an asyncio future.
+    """
+
+    def __init__(self, size=4, headless=True):
+        self.size = size
+        self.jobs = queue.Queue()
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, args=(headless,), name=f"browser-{i}", daemon=True) for i in range(size)]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self, headless):
+        warm = WarmBrowser(headless=headless)
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                fn, loop, future = job
+                with self.lock:
+                    self.busy += 1
+                try:
+                    result = fn(warm.get())
+                    loop.call_soon_threadsafe(_set_result, future, result, None)
+                except Exception as e:
+                    loop.call_soon_threadsafe(_set_result, future, None, e)
+                finally:
+                    with self.lock:
+                        self.busy -= 1
+        finally:
+            warm.close()
+
+    def submit(self, fn):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.put((fn, loop, future))
+        return future
+
+    def status(self):
+        return {"browsers": self.size, "busy": self.busy, "queued": self.jobs.qsize()}
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def _set_result(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class ScrapeService:
+    """
+    HTTP front end for the scrapers.
+
+    GET /search?keyword=ddr5+ram&sources=amazon,newegg&pages=2&deadline=60
+    streams items as NDJSON (or Server-Sent Events with format=sse or an
+    Accept: text/event-stream header) as each results page finishes, then a
+    final summary. Sources run in parallel on a pool of warm browsers;
+    finished searches are served from a TTL cache. At most `max_requests`
+    searches run at once (others get 429), and each request stops at its
+    deadline, returning what it has so far.
+    """
+
+    def __init__(self, browsers=4, max_requests=8, max_pages=5, default_deadline=120, max_deadline=600,
+                 cache_ttl=900, headless=True, use_proxy=False):
+        self.pool = BrowserPool(size=browsers, headless=headless)
+        self.cache = ResultCache(ttl=cache_ttl)
+        self.requests = asyncio.Semaphore(max_requests)
+        self.max_pages = max_pages
+        self.default_deadline = default_deadline
+        self.max_deadline = max_deadline
+        self.headless = headless
+        self.use_proxy = use_proxy
+        self.logger = logging.getLogger(__name__)
+
+    def scrape_source(self, browser, source, keyword, pages, push, cancel, deadline=None):
+        """Runs on a pool thread: scrapes one source, pushing each finished page to the request's stream."""
+        if cancel.is_set():
+            return None
+        scraper = get_scraper(source, headless=self.headless, use_proxy=self.use_proxy, browser=browser)
+        collected = []
+
+        def on_page(page_num, items):
+            page_items = [{**item, "Source": source_label(source)} for item in items]
+            collected.extend(page_items)
+            push(("page", source, page_num, page_items))
+            return not cancel.is_set()
+
+        scraper.on_page = on_page
+        scraper.scrape_search_results(keyword, max_pages=pages, deadline=deadline)
+        stats = scraper.stats
+        # Only a scrape that got through all its pages (or ran out of results) is worth serving again
+        finished = stats.get("pages", 0) >= pages or stats.get("exhausted")
+        if not cancel.is_set() and finished and not stats.get("aborted") and not stats.get("failed_pages") and not stats.get("budget_hits"):
+            self.cache.put((source, keyword, pages), collected)
+        return scraper.stats
+
+    async def search(self, request):
+        keyword = request.query.get("keyword", "").strip()
+        if not keyword:
+            raise web.HTTPBadRequest(text="keyword is required")
+        sources = [source.strip() for source in request.query.get("sources", "all").split(",") if source.strip()]
+        if sources == ["all"]:
+            sources = list(SCRAPERS)
+        unknown = [source for source in sources if source not in SCRAPERS]
+        if unknown:
+            raise web.HTTPBadRequest(text=f"unknown sources: {', '.join(unknown)}")
+        try:
+            pages = max(1, min(int(request.query.get("pages", 1)), self.max_pages))
+            deadline = max(1.0, min(float(request.query.get("deadline", self.default_deadline)), self.max_deadline))
+        except ValueError:
+            raise web.HTTPBadRequest(text="pages and deadline must be numbers")
+        sse = request.query.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+
+        if self.requests.locked():
+            raise web.HTTPTooManyRequests(text="too many searches in progress; retry shortly")
+        async with self.requests:
+            response = web.StreamResponse(headers={
+                "Content-Type": "text/event-stream" if sse else "application/x-ndjson",
+                "Cache-Control": "no-cache",
+            })
+            await response.prepare(request)
+            await self.stream(response, sse, keyword, sources, pages, deadline)
+            return response
+
+    async def stream(self, response, sse, keyword, sources, pages, deadline):
+        started = time.time()
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        cancel = threading.Event()
+        summary = {"keyword": keyword, "items": 0, "sources": {}, "deadline_hit": False}
+
+        def push(message):
+            loop.call_soon_threadsafe(messages.put_nowait, message)
+
+        async def emit(event, data):
+            line = json.dumps(data, ensure_ascii=False)
+            await response.write((f"event: {event}\ndata: {line}\n\n" if sse else f"{line}\n").encode("utf-8"))
+
+        running = {}
+        try:
+            for source in sources:
+                cached = self.cache.get((source, keyword, pages))
+                if cached is not None:
+                    for item in cached:
+                        await emit("item", item)
+                    summary["items"] += len(cached)
+                    summary["sources"][source] = {"status": "cached", "items": len(cached)}
+                    continue
+                future = self.pool.submit(lambda browser, source=source: self.scrape_source(browser, source, keyword, pages, push, cancel, started + deadline))
+                future.add_done_callback(lambda done, source=source: messages.put_nowait(("done", source, None, done)))
+                running[source] = future
+                summary["sources"][source] = {"status": "running", "items": 0}
+
+            while running:
+                remaining = deadline - (time.time() - started)
+                try:
+                    kind, source, page_num, payload = await asyncio.wait_for(messages.get(), timeout=max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    summary["deadline_hit"] = True
+                    for source in running:
+                        summary["sources"][source]["status"] = "deadline"
+                    break
+                if kind == "page":
+                    for item in payload:
+                        await emit("item", {**item, "Page": page_num})
+                    summary["items"] += len(payload)
+                    summary["sources"][source]["items"] += len(payload)
+                    continue
+
+                running.pop(source, None)
+                error = payload.exception()
+                if isinstance(error, SourceBlocked):
+                    summary["sources"][source]["status"] = "blocked"
+                elif error is not None:
+                    summary["sources"][source].update(status="error", error=str(error))
+                else:
+                    stats = payload.result() or {}
+                    summary["sources"][source]["status"] = "partial" if stats.get("failed_pages") or stats.get("budget_hits") else "done"
+        except (ConnectionResetError, asyncio.CancelledError):
+            # Client went away: stop the scrapers after their current page
+            cancel.set()
+            raise
+        finally:
+            cancel.set()
+
+        summary["seconds"] = round(time.time() - started, 1)
+        await emit("done", {"done": True, **summary})
+        self.logger.info(f"Search '{keyword}' streamed {summary['items']} items in {summary['seconds']}s")
+
+    async def health(self, request):
+        return web.json_response({"pool": self.pool.status(), "cached_searches": len(self.cache.entries)})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/search", self.search)
+        app.router.add_get("/health", self.health)
+
+        async def close_pool(app):
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+
+        app.on_cleanup.append(close_pool)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming HTTP scrape API")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--browsers", type=int, default=4, help="Warm browsers (concurrent source scrapes)")
+    parser.add_argument("--max-requests", type=int, default=8, help="Searches served at once; more get 429")
+    parser.add_argument("--max-pages", type=int, default=5, help="Upper bound for the pages parameter")
+    parser.add_argument("--deadline", type=float, default=120, help="Default per-request deadline in seconds")
+    parser.add_argument("--cache-ttl", type=float, default=900, help="Seconds a finished search is served from cache")
+    parser.add_argument("--headful", action="store_true", help="Show the browsers")
+    parser.add_argument("--proxy", action="store_true", help="Use the free proxy pool")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def build():
+        # The semaphore and futures belong to the server's event loop
+        return ScrapeService(browsers=args.browsers, max_requests=args.max_requests, max_pages=args.max_pages,
+                             default_deadline=args.deadline, cache_ttl=args.cache_ttl,
+                             headless=not args.headful, use_proxy=args.proxy).app()
+
+    web.run_app(build(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import json
 import time
 import os
 import subprocess
 import sys
 import base64
+import io
 
 st.set_page_config(page_title="Super Scraper", page_icon="🚀", layout="wide")
 
@@ -81,17 +84,55 @@ headless = st.sidebar.checkbox("Headless Mode", value=True, help="Run browser in
 source = st.sidebar.selectbox("Source", ["All", "Amazon", "Newegg", "BestBuy", "BH", "PCHome"], index=0)
 
 output_file = "products.xlsx"
+# main.py hands each run over as its own Arrow IPC file that is memory-mapped here; Excel is only built for download
+runs_dir = "runs"
+# Cached tables keep their files mapped, so only files older than the cache's capacity are pruned
+runs_kept = 8
+dataset_dir = "dataset"
 
-# Initialize session state for results if not present
-if 'results' not in st.session_state:
-    st.session_state['results'] = None
+# Results live once per process in a read-only Arrow table keyed by run ID;
+# each session only keeps the run ID and its own view state (page, rows per page).
+def file_run_id(path):
+    # The modification time makes a rewritten export a new run
+    return f"file:{path}@{os.stat(path).st_mtime_ns}"
 
-# Try to load existing file into session state on first run if not already loaded
-if st.session_state['results'] is None and os.path.exists(output_file):
-    try:
-        st.session_state['results'] = pd.read_excel(output_file)
-    except Exception:
-        pass # Ignore if file is corrupt or unreadable
+def history_run_id(**filters):
+    return "history:" + json.dumps(filters, sort_keys=True, default=str)
+
+@st.cache_resource(max_entries=runs_kept, show_spinner=False)
+def load_run(run_id):
+    kind, _, spec = run_id.partition(":")
+    if kind == "history":
+        from dataset import read_dataset
+        return read_dataset(as_table=True, **json.loads(spec))
+    path = spec.rsplit("@", 1)[0]
+    if path.endswith(".arrow"):
+        from handoff import read_arrow
+        return read_arrow(path)
+    return pa.Table.from_pandas(pd.read_excel(path), preserve_index=False)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def run_csv(run_id):
+    return load_run(run_id).to_pandas().to_csv(index=False).encode('utf-8-sig')
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def run_excel(run_id):
+    buffer = io.BytesIO()
+    load_run(run_id).to_pandas().to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+# Initialize session state for the run being viewed if not present
+if 'run_id' not in st.session_state:
+    st.session_state['run_id'] = None
+
+# Show the existing export on first run if nothing is selected yet
+if st.session_state['run_id'] is None:
+    from handoff import run_files
+    latest_runs = run_files(runs_dir)
+    if latest_runs:
+        st.session_state['run_id'] = file_run_id(latest_runs[0])
+    elif os.path.exists(output_file):
+        st.session_state['run_id'] = file_run_id(output_file)
 
 if st.sidebar.button("Start Scraping"):
     if not keyword:
@@ -107,9 +148,12 @@ if st.sidebar.button("Start Scraping"):
             # Remove existing file to avoid showing old results on failure
             if os.path.exists(output_file):
                 os.remove(output_file)
+            # Earlier runs stay in their own files; other sessions may still have them mapped
+            from handoff import new_run_path, prune_runs
+            arrow_file = new_run_path(runs_dir)
             
             # Clear current session results
-            st.session_state['results'] = None
+            st.session_state['run_id'] = None
 
             # Construct command
             source_arg = source.lower()
@@ -119,10 +163,14 @@ if st.sidebar.button("Start Scraping"):
             if source == "All": source_arg = "all"
             
             cmd = [sys.executable, "main.py", "--keyword", keyword, "--pages", str(pages), "--source", source_arg]
-            if not use_proxy:
-                cmd.append("--no-proxy")
+            if use_proxy:
+                cmd.append("--proxy")
             if headless:
                 cmd.append("--headless")
+            # Keep every run in the Parquet history as well
+            cmd.extend(["--dataset", dataset_dir])
+            # Hand the results over as Arrow; the Excel file is only built if someone downloads it
+            cmd.extend(["--arrow", arrow_file, "--no-excel"])
                 
             # Run subprocess
             with st.spinner("Scraping in progress..."):
@@ -134,9 +182,10 @@ if st.sidebar.button("Start Scraping"):
                 progress_bar.progress(100)
                 st.markdown(styled_message("Scraping completed!", "success"), unsafe_allow_html=True)
                 
-                # Load new results into session state
-                if os.path.exists(output_file):
-                    st.session_state['results'] = pd.read_excel(output_file)
+                # Point the session at the new run; the table itself is loaded once for all sessions
+                if os.path.exists(arrow_file):
+                    st.session_state['run_id'] = file_run_id(arrow_file)
+                    prune_runs(runs_dir, keep=runs_kept)
                 else:
                     st.markdown(styled_message("Scraper finished but no output file was found.", "warning"), unsafe_allow_html=True)
                     
@@ -148,17 +197,40 @@ if st.sidebar.button("Start Scraping"):
         except Exception as e:
             st.markdown(styled_message(f"An error occurred: {e}", "error"), unsafe_allow_html=True)
 
+# History from the Parquet dataset: filters are pushed down, so only matching partitions are read
+if os.path.isdir(dataset_dir):
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("History")
+    try:
+        from dataset import dataset_values
+        history_sources = st.sidebar.multiselect("Sources", dataset_values(dataset_dir, "site"))
+        history_brands = st.sidebar.multiselect("Brands", dataset_values(dataset_dir, "Brand"))
+        history_dates = st.sidebar.date_input("Date range", value=[], key="history_dates")
+        if st.sidebar.button("Load History"):
+            start_date = history_dates[0] if len(history_dates) > 0 else None
+            end_date = history_dates[1] if len(history_dates) > 1 else start_date
+            st.session_state['run_id'] = history_run_id(
+                root=dataset_dir,
+                sources=history_sources,
+                brands=history_brands,
+                start_date=start_date,
+                end_date=end_date,
+            )
+    except Exception as e:
+        st.sidebar.markdown(styled_message(f"Could not read history: {e}", "warning"), unsafe_allow_html=True)
+
 # Debugging Info
 st.sidebar.markdown("---")
 st.sidebar.subheader("Debug Info")
 st.sidebar.text(f"Session State Keys: {list(st.session_state.keys())}")
-st.sidebar.text(f"Results in State: {st.session_state.get('results') is not None}")
-st.sidebar.text(f"File Exists: {os.path.exists(output_file)}")
+st.sidebar.text(f"Run in State: {st.session_state.get('run_id')}")
+st.sidebar.text(f"Run Files: {len(os.listdir(runs_dir)) if os.path.isdir(runs_dir) else 0}")
 
 # Display Results from Session State
-if st.session_state.get('results') is not None:
+if st.session_state.get('run_id') is not None:
     try:
-        df = st.session_state['results']
+        run_id = st.session_state['run_id']
+        table = load_run(run_id)
         
         st.subheader("Results")
         
@@ -168,8 +240,8 @@ if st.session_state.get('results') is not None:
         with col1:
             rows_per_page = st.selectbox("Rows per page", [20, 30, 50, 100], index=0, key="rows_per_page_select")
         
-        total_rows = len(df)
-        total_pages = (total_rows - 1) // rows_per_page + 1
+        total_rows = table.num_rows
+        total_pages = max(1, (total_rows - 1) // rows_per_page + 1)
         
         with col2:
             # Ensure value is within bounds
@@ -188,18 +260,25 @@ if st.session_state.get('results') is not None:
         
         # Display Dataframe directly (removed st.empty for simplicity)
         st.caption(f"Showing rows {start_idx + 1} to {min(end_idx, total_rows)} of {total_rows}")
-        st.dataframe(df.iloc[start_idx:end_idx])
+        # Only the visible slice is converted to pandas for this session
+        st.dataframe(table.slice(start_idx, rows_per_page).to_pandas())
         
-        # Export CSV
-        csv = df.to_csv(index=False).encode('utf-8-sig')
+        # Export CSV (built once per run and shared)
         st.download_button(
             label="Download Results as CSV",
-            data=csv,
+            data=run_csv(run_id),
             file_name='products.csv',
             mime='text/csv',
             key="download_csv_btn"
         )
-        st.info(f"Data saved to `{output_file}`")
+        if st.button("Prepare Excel Download", key="prepare_excel_btn"):
+            st.download_button(
+                label="Download Results as Excel",
+                data=run_excel(run_id),
+                file_name=output_file,
+                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                key="download_excel_btn"
+            )
     except Exception as e:
         st.markdown(styled_message(f"Error displaying results: {e}", "error"), unsafe_allow_html=True)
         st.exception(e) # Show full traceback for debugging
@@ -0,0 +1,192 @@
+import gzip
+import hashlib
+import html as html_lib
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_ARCHIVE_DIR = "page_archive"
+
+# Blocked while reprocessing; stylesheets load because inner_text depends on layout and visibility
+REPROCESS_BLOCKED_RESOURCES = ("script", "xhr", "fetch", "websocket", "eventsource", "image", "media", "font")
+
+# Set by main.py --archive; scrapers store every results page while it is set
+page_archive = None
+
+
+class PageArchive:
+    """
+    Content-addressed store of fetched results pages.
+
+    Each page's rendered HTML is gzipped under objects/<aa>/<sha256>.html.gz,
+    so an identical page is stored once no matter how often it is fetched.
+    Every fetch is recorded in index.db with its source, keyword, page number,
+    URL and timestamp.
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.db")
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetches ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, digest TEXT NOT NULL, source TEXT NOT NULL, "
+                "keyword TEXT NOT NULL, page INTEGER NOT NULL, url TEXT, fetched REAL NOT NULL)"
+            )
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.html.gz")
+
+    def store(self, html, source, keyword, page, url=None):
+        """Archives one page and returns its digest."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp_path, path)
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute(
+                "INSERT INTO fetches (digest, source, keyword, page, url, fetched) VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, source, keyword, page, url, time.time()),
+            )
+        return digest
+
+    def read(self, digest):
+        with open(self.object_path(digest), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def pages(self, source=None, keyword=None, latest=False):
+        """
+        Distinct archived pages as (digest, source, keyword, page, url, fetched),
+        ordered by source, keyword and page; `fetched` is the last time that
+        content was stored. With `latest`, only the most recent fetch of each
+        (source, keyword, page) is returned instead of one row per version.
+        """
+        if latest:
+            # SQLite takes the bare columns from the row holding MAX(fetched)
+            query = "SELECT digest, source, keyword, page, url, MAX(fetched) AS fetched FROM fetches"
+            group = "source, keyword, page"
+        else:
+            query = "SELECT digest, source, keyword, page, MAX(url), MAX(fetched) AS fetched FROM fetches"
+            group = "digest, source, keyword, page"
+        conditions, params = [], []
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if keyword:
+            conditions.append("keyword = ?")
+            params.append(keyword)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" GROUP BY {group} ORDER BY source, keyword, page, fetched"
+        with sqlite3.connect(self.index_path) as conn:
+            return conn.execute(query, params).fetchall()
+
+    def stats(self):
+        with sqlite3.connect(self.index_path) as conn:
+            fetches, unique = conn.execute("SELECT COUNT(*), COUNT(DISTINCT digest) FROM fetches").fetchone()
+        return {"fetches": fetches, "unique_pages": unique}
+
+
+def enable(root=DEFAULT_ARCHIVE_DIR):
+    global page_archive
+    page_archive = PageArchive(root)
+    return page_archive
+
+
+def archive_page(page, source, keyword, page_num):
+    """Stores a live Playwright page's current DOM if archiving is enabled."""
+    if page_archive is None:
+        return
+    try:
+        page_archive.store(page.content(), source, keyword, page_num, page.url)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not archive {source} page {page_num}: {e}")
+
+
+def _block_reprocess_resources(route):
+    if route.request.resource_type in REPROCESS_BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _with_base(html, url):
+    """Points relative stylesheet links at the page's original URL."""
+    if not url or re.search(r"<base\b", html, re.IGNORECASE):
+        return html
+    return re.sub(r"(<head\b[^>]*>)", lambda match: f'{match.group(1)}<base href="{html_lib.escape(url)}">', html, count=1, flags=re.IGNORECASE)
+
+
+def _reprocess_chunk(root, rows):
+    """Process-pool worker: re-runs the current extract_cards over archived pages in one offline browser."""
+    from playwright.sync_api import sync_playwright
+    from scraper import get_scraper, source_label
+
+    archive = PageArchive(root)
+    logger = logging.getLogger(__name__)
+    items = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        # Archived DOM is already rendered: no scripts or data requests, only stylesheets for layout
+        context = browser.new_context(java_script_enabled=False)
+        context.route("**/*", _block_reprocess_resources)
+        page = context.new_page()
+        try:
+            for digest, source, keyword, page_num, url, fetched in rows:
+                try:
+                    page.set_content(_with_base(archive.read(digest), url), wait_until="load")
+                    scraper = get_scraper(source, headless=True, use_proxy=False)
+                    scraper.offline = True
+                    scraper.page = page
+                    for item in scraper.finish_items(scraper.extract_cards(keyword)):
+                        item["Source"] = source_label(source)
+                        item["Keyword"] = keyword
+                        item["Page"] = page_num
+                        # Tells apart the copies of a product from different archived runs of the same search
+                        item["Fetched"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fetched))
+                        items.append(item)
+                except Exception as e:
+                    logger.warning(f"Could not reprocess {source} page {page_num} ({digest[:12]}): {e}")
+        finally:
+            browser.close()
+    return items
+
+
+def reprocess(root=DEFAULT_ARCHIVE_DIR, source=None, keyword=None, workers=None, latest=False):
+    """
+    Re-extracts every archived page with the current parsers, spread across
+    a process pool (one offline browser per process). Items carry the fetch
+    time of their page; `latest` limits the run to the most recent fetch of
+    each search page. Returns a ResultSet.
+    """
+    from records import ResultSet
+
+    logger = logging.getLogger(__name__)
+    archive = PageArchive(root)
+    rows = archive.pages(source=source, keyword=keyword, latest=latest)
+    results = ResultSet()
+    if not rows:
+        logger.warning(f"No archived pages in {root}")
+        return results
+
+    workers = min(workers or os.cpu_count() or 1, len(rows))
+    # Several contiguous chunks per process keep the pool busy and the output in archive order
+    chunk_size = -(-len(rows) // (workers * 4))
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    logger.info(f"Reprocessing {len(rows)} archived pages ({archive.stats()}) on {workers} processes")
+
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for items in pool.map(_reprocess_chunk, [root] * len(chunks), chunks):
+            results.extend(items)
+    logger.info(f"Reprocessed {len(rows)} pages into {len(results)} items in {time.time() - started:.1f}s")
+    return results
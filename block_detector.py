@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+import time
+
+RESULTS = "results"
+CAPTCHA = "captcha"
+DENIED = "denied"
+EMPTY = "empty"
+
+BLOCKED = (CAPTCHA, DENIED)
+
+# Cheap DOM markers for bot walls, matched in the same wait as the result cards
+# so a blocked page is recognised as soon as it renders.
+CAPTCHA_SELECTORS = [
+    "form[action*='validateCaptcha']",  # Amazon robot check
+    "#captchacharacters",
+    "#px-captcha",  # PerimeterX
+    "iframe[src*='captcha']",
+    "div.g-recaptcha",
+    "div.h-captcha",
+]
+DENIED_SELECTORS = [
+    "h1:has-text('Access Denied')",  # Akamai
+    "h1:has-text('Pardon Our Interruption')",
+    "title:has-text('Robot Check')",
+]
+BLOCK_STATUSES = (403, 429, 503)
+
+DEFAULT_STATE_FILE = "circuit_breaker.json"
+
+
+class SourceBlocked(Exception):
+    """Raised when a source is skipped because its circuit breaker is open."""
+
+
+def _any_present(page, selectors):
+    return any(page.locator(selector).count() > 0 for selector in selectors)
+
+
+def classify_page(page, results_selector, response=None):
+    """Classifies a loaded results page as results, captcha, denied or empty."""
+    if _any_present(page, CAPTCHA_SELECTORS) or "captcha" in page.url.lower():
+        return CAPTCHA
+    if _any_present(page, DENIED_SELECTORS):
+        return DENIED
+    if page.locator(results_selector).count() > 0:
+        return RESULTS
+    if response is not None and response.status in BLOCK_STATUSES:
+        return DENIED
+    return EMPTY
+
+
+def wait_and_classify(page, results_selector, response=None, timeout=15000):
+    """
+    Waits until either result cards or a block marker appear (whichever comes
+    first), then classifies the page. A captcha no longer costs the full
+    results timeout.
+    """
+    if response is None or response.status not in BLOCK_STATUSES:
+        try:
+            page.wait_for_selector(", ".join([results_selector] + CAPTCHA_SELECTORS + DENIED_SELECTORS), timeout=timeout)
+        except Exception:
+            pass
+    return classify_page(page, results_selector, response)
+
+
+class CircuitBreaker:
+    """
+    Per-site circuit breaker persisted to disk so consecutive runs (and
+    workers sharing the file) stop hammering a site that keeps blocking us.
+
+    After `threshold` consecutive blocks the breaker opens and the site is
+    skipped for `cooldown` seconds. After the cool-down one trial run is
+    allowed (half-open); a success closes it again, another block re-opens it.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_FILE, threshold=3, cooldown=1800):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self, state):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def allow(self, site):
+        """Returns False while the site's breaker is open and cooling down."""
+        with self.lock:
+            entry = self._load().get(site)
+        if not entry or entry.get("opened_at") is None:
+            return True
+        return time.time() - entry["opened_at"] >= self.cooldown
+
+    def remaining(self, site):
+        with self.lock:
+            entry = self._load().get(site) or {}
+        if entry.get("opened_at") is None:
+            return 0
+        return max(0, self.cooldown - (time.time() - entry["opened_at"]))
+
+    def record_block(self, site, kind=CAPTCHA):
+        with self.lock:
+            state = self._load()
+            entry = state.setdefault(site, {"failures": 0, "opened_at": None})
+            entry["failures"] += 1
+            entry["last_block"] = kind
+            half_open = entry["opened_at"] is not None
+            if half_open or entry["failures"] >= self.threshold:
+                entry["opened_at"] = time.time()
+                self.logger.warning(f"Circuit breaker for {site} opened after {entry['failures']} blocks; cooling down {self.cooldown}s")
+            self._save(state)
+
+    def record_success(self, site):
+        with self.lock:
+            state = self._load()
+            entry = state.get(site)
+            if not entry or (entry["failures"] == 0 and entry["opened_at"] is None):
+                return
+            state[site] = {"failures": 0, "opened_at": None}
+            self._save(state)
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import time
+
+PROFILE_ROOT = "browser_profiles"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+# Set to False (main.py --fresh-profile) to start every run from a clean context
+REUSE_PROFILES = True
+
+# A saved session older than this is not trusted for direct navigation
+SESSION_MAX_AGE = 12 * 3600
+
+# Cookie that must be present (and unexpired) for a site's saved session to count as valid
+SESSION_COOKIES = {
+    "amazon": "session-id",
+}
+
+
+class BrowserSession:
+    """
+    Browser context for one site that persists between runs.
+
+    The context runs on a per-site Chromium user data dir, so cookies, local
+    storage and the HTTP disk cache survive across runs, and the storage state
+    is also exported to JSON after each run. If the profile is locked by
+    another process (e.g. a second worker on the same host) it falls back to a
+    regular context seeded from the saved storage state.
+
+    `has_session` tells the scraper whether it can skip warm-up steps such as
+    visiting the homepage and go straight to the search URL.
+
+    If an already-running `browser` is passed, the session is a new context on
+    it seeded from the saved storage state, and closing the session leaves
+    the browser running.
+    """
+
+    def __init__(self, p, site, headless=True, locale=None, proxy=None, browser=None, javascript=True, har_path=None):
+        self.site = site
+        self.browser = None
+        self.context = None
+        self.logger = logging.getLogger(__name__)
+
+        profile_dir = os.path.join(PROFILE_ROOT, site)
+        self.user_data_dir = os.path.join(profile_dir, "user_data")
+        self.state_path = os.path.join(profile_dir, "storage_state.json")
+        self.has_session = REUSE_PROFILES and self._saved_session_valid()
+        self.discarded = False
+
+        options = {"user_agent": USER_AGENT}
+        if locale:
+            options["locale"] = locale
+        if proxy:
+            options["proxy"] = {"server": proxy}
+        if not javascript:
+            options["java_script_enabled"] = False
+        if har_path:
+            # Written when the context closes
+            options["record_har_path"] = har_path
+            options["record_har_content"] = "omit"
+
+        if REUSE_PROFILES and browser is None:
+            os.makedirs(self.user_data_dir, exist_ok=True)
+            try:
+                self.context = p.chromium.launch_persistent_context(self.user_data_dir, headless=headless, args=LAUNCH_ARGS, **options)
+                self.logger.info(f"Reusing browser profile {self.user_data_dir} (saved session: {self.has_session})")
+            except Exception as e:
+                self.logger.warning(f"Browser profile {self.user_data_dir} unavailable ({e}); using a temporary context")
+
+        if self.context is None:
+            if browser is None:
+                self.browser = browser = p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+            if REUSE_PROFILES and os.path.exists(self.state_path):
+                options["storage_state"] = self.state_path
+            self.context = browser.new_context(**options)
+
+    def _saved_session_valid(self):
+        if not os.path.exists(self.state_path):
+            return False
+        if time.time() - os.path.getmtime(self.state_path) > SESSION_MAX_AGE:
+            return False
+
+        cookie_name = SESSION_COOKIES.get(self.site)
+        if not cookie_name:
+            return True
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                cookies = json.load(f).get("cookies", [])
+        except Exception:
+            return False
+        now = time.time()
+        for cookie in cookies:
+            # expires == -1 means a session cookie
+            if cookie.get("name") == cookie_name and (cookie.get("expires", -1) == -1 or cookie["expires"] > now):
+                return True
+        return False
+
+    def has_cookie(self, url, name):
+        return any(cookie["name"] == name for cookie in self.context.cookies(url))
+
+    def discard(self):
+        """Drops the saved session after a block so the next run does not reuse a flagged identity."""
+        self.discarded = True
+        self.has_session = False
+        try:
+            self.context.clear_cookies()
+        except Exception:
+            pass
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def close(self):
+        try:
+            if REUSE_PROFILES and not self.discarded:
+                os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+                self.context.storage_state(path=self.state_path)
+        except Exception as e:
+            self.logger.warning(f"Could not save storage state for {self.site}: {e}")
+        finally:
+            try:
+                self.context.close()
+            finally:
+                if self.browser:
+                    self.browser.close()
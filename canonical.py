@@ -0,0 +1,68 @@
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qs, unquote
+
+SITE_HOSTS = {
+    "amazon.com": "amazon",
+    "newegg.com": "newegg",
+    "bestbuy.com": "bestbuy",
+    "bhphotovideo.com": "bh",
+    "pchome.com.tw": "pchome",
+}
+
+# Product ID pattern per site, searched in the (decoded) path and query
+PRODUCT_IDS = {
+    "amazon": re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?&]|$)"),
+    "newegg": re.compile(r"\b(N82E\d{11}|9SI[A-Z0-9]{9,}(?:-\d+)?|\d{2}-\d{3}-\d{3}|\d[A-Z0-9]{2}-\d{4}-\d{5})\b", re.IGNORECASE),
+    "bestbuy": re.compile(r"(?:skuId=|/)(\d{7,8})(?:\.p\b|&|$)"),
+    "bh": re.compile(r"/c/product/(\d+-[A-Z]{3})\b", re.IGNORECASE),
+    "pchome": re.compile(r"/prod/([A-Z0-9]{6}-[A-Z0-9]{9,})", re.IGNORECASE),
+}
+
+CANONICAL_URLS = {
+    "amazon": "https://www.amazon.com/dp/{}",
+    "newegg": "https://www.newegg.com/p/{}",
+    "bestbuy": "https://www.bestbuy.com/site/{0}.p?skuId={0}",
+    "bh": "https://www.bhphotovideo.com/c/product/{}",
+    "pchome": "https://24h.pchome.com.tw/prod/{}",
+}
+
+
+def site_for_url(url):
+    host = urlsplit(url).netloc.lower()
+    for suffix, site in SITE_HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return site
+    return None
+
+
+def product_id(site, url):
+    """
+    Extracts the site's product ID (ASIN, Newegg item number, Best Buy SKU,
+    B&H item ID, PCHome prod ID) from a product link. Tracking redirects such
+    as Amazon's /sspa/click?url=... are unwrapped first. Returns None if the
+    link carries no ID.
+    """
+    if not url or url == "N/A" or site not in PRODUCT_IDS:
+        return None
+    parts = urlsplit(url)
+    candidates = [parts.path + "?" + parts.query]
+    # Sponsored/redirect links carry the real product URL in a query parameter
+    for values in parse_qs(parts.query).values():
+        candidates.extend(unquote(value) for value in values if "/" in value)
+    for candidate in candidates:
+        match = PRODUCT_IDS[site].search(candidate)
+        if match:
+            return match.group(1).upper() if site != "bestbuy" else match.group(1)
+    return None
+
+
+def canonical_url(url, site=None):
+    """Canonical product URL: the site's ID-based form when an ID is found, otherwise the URL without query or fragment."""
+    if not url or url == "N/A":
+        return None
+    site = site or site_for_url(url)
+    found = product_id(site, url)
+    if found:
+        return CANONICAL_URLS[site].format(found)
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme or "https", parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
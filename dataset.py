@@ -0,0 +1,132 @@
+import logging
+import re
+import time
+import uuid
+from datetime import date, datetime
+
+DEFAULT_DATASET_DIR = "dataset"
+
+# Repeated text columns are dictionary-encoded; free text stays plain
+CATEGORY_COLUMNS = ["Brand", "Capacity", "Speed", "CL_Timing", "Voltage", "Source", "Keyword"]
+TEXT_COLUMNS = ["Model", "Title", "Product Link"]
+FLAG_COLUMNS = ["XMP_Support", "EXPO_Support", "RGB"]
+
+
+def partition_key(label):
+    """'B&H' -> 'bh', 'PCHome' -> 'pchome': safe directory names for the site partition."""
+    return re.sub(r"[^a-z0-9]", "", str(label).lower()) or "unknown"
+
+
+def parse_price(value):
+    match = re.search(r"[\d,]+(?:\.\d+)?", str(value or ""))
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def parse_rating(value):
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return float(match.group(0)) if match else None
+
+
+def _column(items, key):
+    """Reads one column without building row dicts (ResultSet buffers are used directly)."""
+    columns = getattr(items, "columns", None)
+    if columns is not None:
+        return columns.get(key, [None] * len(items))
+    return [item.get(key) for item in items]
+
+
+def to_table(items, keyword=None, run_id=None, scraped_at=None):
+    """Builds a typed Arrow table (plus date/site partition columns) from scraped items."""
+    import pyarrow as pa
+
+    scraped_at = scraped_at or time.time()
+    n = len(items)
+    arrays = {}
+    for key in CATEGORY_COLUMNS:
+        if key == "Keyword":
+            values = _column(items, key) if keyword is None else [keyword] * n
+        else:
+            values = _column(items, key)
+        arrays[key] = pa.array(values, type=pa.string()).dictionary_encode()
+    for key in TEXT_COLUMNS:
+        arrays[key] = pa.array(_column(items, key), type=pa.string())
+    for key in FLAG_COLUMNS:
+        arrays[key] = pa.array([value == "Yes" for value in _column(items, key)], type=pa.bool_())
+    arrays["Price"] = pa.array([parse_price(value) for value in _column(items, "Price")], type=pa.float64())
+    arrays["Rating"] = pa.array([parse_rating(value) for value in _column(items, "Rating")], type=pa.float32())
+    arrays["scraped_at"] = pa.array([datetime.fromtimestamp(scraped_at)] * n, type=pa.timestamp("s"))
+    arrays["run_id"] = pa.array([run_id] * n, type=pa.string()).dictionary_encode()
+    arrays["date"] = pa.array([date.fromtimestamp(scraped_at).isoformat()] * n, type=pa.string())
+    arrays["site"] = pa.array([partition_key(value) for value in _column(items, "Source")], type=pa.string())
+    return pa.table(arrays)
+
+
+def append_run(items, root=DEFAULT_DATASET_DIR, keyword=None, run_id=None):
+    """
+    Appends one run to a Parquet dataset partitioned as date=YYYY-MM-DD/site=<source>/.
+    Each run writes its own files, so existing partitions are never rewritten.
+    """
+    import pyarrow.dataset as ds
+
+    if not items:
+        return None
+    run_id = run_id or f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    table = to_table(items, keyword=keyword, run_id=run_id)
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=["date", "site"],
+        partitioning_flavor="hive",
+        basename_template=f"{run_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    logging.getLogger(__name__).info(f"Appended {table.num_rows} items to {root} (run {run_id})")
+    return run_id
+
+
+def read_dataset(root=DEFAULT_DATASET_DIR, sources=None, brands=None, start_date=None, end_date=None,
+                 keyword=None, columns=None, as_table=False):
+    """
+    Loads matching rows as a DataFrame (or an Arrow table with as_table=True).
+    Source and date filters prune whole partitions; brand/keyword filters are
+    pushed into the Parquet scan (row group statistics); only `columns` are
+    read when given.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    conditions = []
+    if sources:
+        conditions.append(ds.field("site").isin([partition_key(source) for source in sources]))
+    if start_date:
+        conditions.append(ds.field("date") >= str(start_date))
+    if end_date:
+        conditions.append(ds.field("date") <= str(end_date))
+    if brands:
+        conditions.append(ds.field("Brand").isin(list(brands)))
+    if keyword:
+        conditions.append(ds.field("Keyword") == keyword)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table if as_table else table.to_pandas()
+
+
+def dataset_values(root=DEFAULT_DATASET_DIR, column="site"):
+    """Distinct values of a (partition) column, for filter pickers."""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    table = ds.dataset(root, format="parquet", partitioning="hive").to_table(columns=[column])
+    values = table.column(column)
+    if hasattr(values.type, "value_type"):
+        values = values.cast(values.type.value_type)
+    return sorted(value for value in pc.unique(values).to_pylist() if value is not None)
@@ -0,0 +1,147 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import time
+
+from canonical import canonical_url, product_id
+from dataset import parse_price, partition_key
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+NEW = "new"
+REMOVED = "removed"
+PRICE_CHANGED = "price_changed"
+
+CHANGE_COLUMNS = ["Change", "Source", "Key", "Title", "Old Price", "New Price", "Delta", "Product Link"]
+
+
+def item_key(item):
+    """Canonical join key: site plus product ID, else the canonical link, else the title."""
+    site = partition_key(item.get("Source", ""))
+    link = item.get("Product Link")
+    found = product_id(site, link)
+    if found:
+        return f"{site}:{found}"
+    url = canonical_url(link, site)
+    if url:
+        return f"{site}:{url}"
+    return f"{site}:title:{item.get('Title', '')}"
+
+
+def snapshot_path(keyword, root=DEFAULT_SNAPSHOT_DIR):
+    slug = re.sub(r"[^a-z0-9]+", "-", keyword.lower()).strip("-") or "all"
+    return os.path.join(root, f"{slug}.json.gz")
+
+
+def build_snapshot(items):
+    """key -> [source, title, price, link] for one run; the first copy of a product wins."""
+    snapshot = {}
+    for item in items:
+        key = item_key(item)
+        if key not in snapshot:
+            snapshot[key] = [item.get("Source", ""), item.get("Title", ""), item.get("Price", "N/A"), item.get("Product Link", "N/A")]
+    return snapshot
+
+
+def load_snapshot(path):
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["items"]
+
+
+def save_snapshot(path, snapshot, keyword):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"keyword": keyword, "created": time.time(), "items": snapshot}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def diff_snapshots(previous, current, partial_sources=()):
+    """
+    Hash join of two snapshots on their keys, linear in the number of rows.
+    Returns change rows for new products, removed products and price changes
+    (a price appearing or disappearing counts as a change in availability).
+    Removals are only reported for sources present in the current run and
+    not in `partial_sources`, so a source that failed entirely or lost pages
+    does not look like it lost those products.
+    """
+    changes = []
+    for key, (source, title, price, link) in current.items():
+        old = previous.get(key)
+        if old is None:
+            changes.append([NEW, source, key, title, "", price, "", link])
+            continue
+        old_price = old[2]
+        old_value, new_value = parse_price(old_price), parse_price(price)
+        if old_value is None and new_value is None:
+            continue
+        if old_value is None or new_value is None or abs(new_value - old_value) >= 0.005:
+            delta = f"{new_value - old_value:+.2f}" if old_value is not None and new_value is not None else ""
+            changes.append([PRICE_CHANGED, source, key, title, old_price, price, delta, link])
+
+    current_sources = {source for source, _, _, _ in current.values()} - set(partial_sources)
+    for key, (source, title, price, link) in previous.items():
+        if key not in current and source in current_sources:
+            changes.append([REMOVED, source, key, title, price, "", "", link])
+    return changes
+
+
+def changes_path(output):
+    return f"{os.path.splitext(output)[0]}_changes.csv"
+
+
+def merge_snapshot(previous, current, partial_sources=()):
+    """
+    The snapshot to keep after a run: the current products, plus the previous
+    products of sources that were missing from the run or only partly
+    scraped, so the next run is not compared against a truncated baseline.
+    """
+    complete = {source for source, _, _, _ in current.values()} - set(partial_sources)
+    merged = dict(current)
+    for key, entry in (previous or {}).items():
+        if key not in merged and entry[0] not in complete:
+            merged[key] = entry
+    return merged
+
+
+def diff_run(items, keyword, output, root=DEFAULT_SNAPSHOT_DIR, partial_sources=()):
+    """
+    Compares a finished run with the previous snapshot for the same keyword,
+    writes the changes next to the export (<output>_changes.csv) and updates
+    the snapshot. `partial_sources` are the Source labels whose scrape lost
+    pages; their previous products are kept in the snapshot. The first run
+    for a keyword only records the baseline. Returns the change rows, or
+    None without a previous snapshot.
+    """
+    logger = logging.getLogger(__name__)
+    path = snapshot_path(keyword, root)
+    started = time.time()
+    current = build_snapshot(items)
+    previous = load_snapshot(path)
+    save_snapshot(path, merge_snapshot(previous, current, partial_sources), keyword)
+    if partial_sources:
+        logger.warning(f"Partial results from {', '.join(sorted(partial_sources))}; kept their previous snapshot entries")
+    if previous is None:
+        logger.info(f"No previous snapshot for '{keyword}'; saved {len(current)} products as the baseline in {path}")
+        return None
+
+    changes = diff_snapshots(previous, current, partial_sources)
+    target = changes_path(output)
+    with open(target, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CHANGE_COLUMNS)
+        writer.writerows(changes)
+
+    counts = {kind: 0 for kind in (NEW, REMOVED, PRICE_CHANGED)}
+    for change in changes:
+        counts[change[0]] += 1
+    logger.info(
+        f"Diff against previous run: {counts[NEW]} new, {counts[REMOVED]} removed, {counts[PRICE_CHANGED]} price changes "
+        f"({len(previous)} -> {len(current)} products, {time.time() - started:.2f}s); written to {target}"
+    )
+    return changes
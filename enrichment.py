@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import time
+
+from browser_profiles import USER_AGENT, LAUNCH_ARGS
+from block_detector import BLOCK_STATUSES, CAPTCHA_SELECTORS, DENIED_SELECTORS
+from canonical import canonical_url
+
+DEFAULT_CACHE_FILE = "detail_cache.db"
+DEFAULT_TTL_HOURS = 7 * 24
+
+# Resource types a spec table never needs
+BLOCKED_RESOURCES = ("image", "media", "font")
+
+# Collects label/value pairs from spec tables (th/td or td/td rows), definition
+# lists and "Label: value" list items in a single pass over the DOM.
+COLLECT_SPECS_JS = """
+() => {
+    const specs = {};
+    const clean = (text) => (text || "").replace(/\\s+/g, " ").replace(/[\\u200e\\u200f]/g, "").trim();
+    const add = (label, value) => {
+        label = clean(label).replace(/:$/, "");
+        value = clean(value);
+        if (label && value && label.length < 80 && !(label in specs)) specs[label] = value;
+    };
+    document.querySelectorAll("tr").forEach(row => {
+        const cells = row.querySelectorAll("th, td");
+        if (cells.length === 2) add(cells[0].innerText, cells[1].innerText);
+    });
+    document.querySelectorAll("dl").forEach(list => {
+        const terms = list.querySelectorAll("dt");
+        terms.forEach(term => {
+            const value = term.nextElementSibling;
+            if (value && value.tagName === "DD") add(term.innerText, value.innerText);
+        });
+    });
+    document.querySelectorAll("li").forEach(item => {
+        const text = clean(item.innerText);
+        const match = text.match(/^([^:]{2,60}):\\s*(.+)$/);
+        if (match) add(match[1], match[2]);
+    });
+    return specs;
+}
+"""
+
+# Spec label patterns mapped to item fields, checked in order
+FIELD_PATTERNS = [
+    ("Voltage", re.compile(r"voltage", re.IGNORECASE)),
+    ("CL_Timing", re.compile(r"cas latency|\bcl\b|latency|timing", re.IGNORECASE)),
+    ("Speed", re.compile(r"speed|frequency", re.IGNORECASE)),
+    ("Capacity", re.compile(r"capacity|total memory|memory size", re.IGNORECASE)),
+    ("Brand", re.compile(r"^brand$|manufacturer", re.IGNORECASE)),
+]
+
+
+def specs_to_fields(specs):
+    """Maps a page's raw label/value spec pairs onto the item columns."""
+    fields = {}
+    for label, value in specs.items():
+        for field, pattern in FIELD_PATTERNS:
+            if field not in fields and pattern.search(label):
+                if field == "CL_Timing":
+                    cl = re.search(r"(?:CL\s*)?(\d{2})\b", value, re.IGNORECASE)
+                    if not cl:
+                        continue
+                    value = f"CL{cl.group(1)}"
+                fields[field] = value
+                break
+
+    blob = " ".join(f"{label} {value}" for label, value in specs.items())
+    if re.search(r"\bXMP\b|extreme memory profile", blob, re.IGNORECASE):
+        fields["XMP_Support"] = "Yes"
+    if re.search(r"\bEXPO\b", blob):
+        fields["EXPO_Support"] = "Yes"
+    if re.search(r"\bRGB\b", blob):
+        fields["RGB"] = "Yes"
+    return fields
+
+
+class DetailCache:
+    """SQLite cache of enriched fields keyed by canonical product URL, with a TTL."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS details (url TEXT PRIMARY KEY, fetched REAL NOT NULL, fields TEXT NOT NULL)")
+
+    def get_many(self, urls):
+        """Returns {url: fields} for the URLs with a fresh cache entry."""
+        found = {}
+        cutoff = time.time() - self.ttl
+        with sqlite3.connect(self.path) as conn:
+            for url in urls:
+                row = conn.execute("SELECT fields FROM details WHERE url = ? AND fetched >= ?", (url, cutoff)).fetchone()
+                if row:
+                    found[url] = json.loads(row[0])
+        return found
+
+    def put(self, url, fields):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO details (url, fetched, fields) VALUES (?, ?, ?)",
+                (url, time.time(), json.dumps(fields)),
+            )
+
+
+class Enricher:
+    """
+    Optional stage that opens product detail pages in a bounded pool of tabs
+    and fills Voltage, CL_Timing, XMP/EXPO and friends from the spec tables,
+    instead of guessing them from search-card titles. Only URLs missing from
+    the cache (or past its TTL) are fetched.
+    """
+
+    def __init__(self, tabs=4, headless=True, cache=None, timeout=30000):
+        self.tabs = tabs
+        self.headless = headless
+        self.cache = cache or DetailCache()
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self.stats = {}
+
+    def enrich(self, items):
+        """Updates items in place and returns them."""
+        by_url = {}
+        for item in items:
+            url = canonical_url(item.get("Product Link"))
+            if url:
+                by_url.setdefault(url, []).append(item)
+
+        cached = self.cache.get_many(by_url)
+        to_fetch = [url for url in by_url if url not in cached]
+        self.logger.info(f"Enriching {len(by_url)} products: {len(cached)} cached, {len(to_fetch)} to fetch with {self.tabs} tabs")
+
+        started = time.time()
+        fetched = asyncio.run(self._fetch_all(to_fetch)) if to_fetch else {}
+        elapsed = time.time() - started
+
+        for url, fields in {**cached, **fetched}.items():
+            for item in by_url[url]:
+                # Detail pages fill gaps; values already parsed from the title are kept
+                for field, value in fields.items():
+                    if item.get(field) in (None, "N/A", "No"):
+                        item[field] = value
+
+        # Only successful fetches count; failures and timeouts would inflate the rate
+        rate = len(fetched) / elapsed * 60 if elapsed > 0 else 0.0
+        self.stats = {
+            "products": len(by_url),
+            "cached": len(cached),
+            "fetched": len(fetched),
+            "failed": len(to_fetch) - len(fetched),
+            "seconds": elapsed,
+            "pages_per_min": rate,
+        }
+        self.logger.info(
+            f"Enrichment done: {len(fetched)} fetched, {self.stats['failed']} failed in {elapsed:.1f}s ({rate:.1f} detail pages/min)"
+        )
+        return items
+
+    async def _fetch_all(self, urls):
+        from playwright.async_api import async_playwright
+        try:
+            from playwright_stealth import stealth_async
+        except ImportError:
+            from playwright_stealth.stealth import stealth_async
+
+        results = {}
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+            context = await browser.new_context(user_agent=USER_AGENT, locale="en-US")
+            await context.add_cookies([
+                {'name': 'i18n-prefs', 'value': 'USD', 'domain': '.amazon.com', 'path': '/'}
+            ])
+            await stealth_async(context)
+            await context.route("**/*", self._route)
+            try:
+                # One long-lived tab per worker; the queue bounds concurrency to `tabs`
+                await asyncio.gather(*[self._tab_worker(context, queue, results) for _ in range(min(self.tabs, len(urls)))])
+            finally:
+                await browser.close()
+        return results
+
+    async def _route(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _tab_worker(self, context, queue, results):
+        page = await context.new_page()
+        while not queue.empty():
+            url = queue.get_nowait()
+            try:
+                response = await page.goto(url, timeout=self.timeout, wait_until="domcontentloaded")
+                blocked = response is not None and response.status in BLOCK_STATUSES
+                if blocked or any([await page.locator(selector).count() for selector in CAPTCHA_SELECTORS + DENIED_SELECTORS]):
+                    self.logger.warning(f"Detail page blocked: {url}")
+                    continue
+                specs = await page.evaluate(COLLECT_SPECS_JS)
+                fields = specs_to_fields(specs)
+                if not fields:
+                    # Spec sections rendered later by scripts (or an unrecognised block page) must not be
+                    # cached as "no specs" for the whole TTL; the product is retried on the next run
+                    self.logger.warning(f"No spec fields found on {url}")
+                    continue
+                results[url] = fields
+                self.cache.put(url, fields)
+            except Exception as e:
+                self.logger.warning(f"Could not enrich {url}: {e}")
+        await page.close()
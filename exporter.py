@@ -6,7 +6,7 @@ def save_to_excel(data, filename="amazon_products.xlsx"):
     Saves a list of dictionaries to an Excel file.
     
     Args:
-        data (list): List of dictionaries containing product data.
+        data (list | ResultSet): Product items, as dictionaries or a ResultSet.
         filename (str): Name of the output file.
     """
     if not data:
@@ -14,7 +14,8 @@ def save_to_excel(data, filename="amazon_products.xlsx"):
         return
 
     try:
-        df = pd.DataFrame(data)
+        # ResultSet builds its frame from column buffers instead of row dicts
+        df = data.to_dataframe() if hasattr(data, "to_dataframe") else pd.DataFrame(data)
         
         # Ensure the directory exists
         directory = os.path.dirname(filename)
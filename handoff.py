@@ -0,0 +1,137 @@
+import argparse
+import os
+import tempfile
+import time
+
+from records import UNIQUE_COLUMNS, ResultSet, _synthetic_items
+
+# Where app.py keeps one Arrow file per run
+RUNS_DIR = "runs"
+
+
+def arrow_path(output):
+    """products.xlsx -> products.arrow"""
+    return f"{os.path.splitext(output)[0]}.arrow"
+
+
+def _items_table(items):
+    import pyarrow as pa
+
+    columns = getattr(items, "columns", None)
+    if columns is None:
+        items = ResultSet(items)
+        columns = items.columns
+    arrays = {}
+    for key, values in columns.items():
+        try:
+            array = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+        # Repeated fields are dictionary-encoded, like ResultSet.to_dataframe's categoricals
+        if key not in UNIQUE_COLUMNS and pa.types.is_string(array.type):
+            array = array.dictionary_encode()
+        arrays[key] = array
+    return pa.table(arrays)
+
+
+def write_arrow(items, path):
+    """
+    Writes items as an uncompressed Arrow IPC (Feather v2) file that readers
+    can memory-map without copying. The file is written next to the target
+    and renamed into place, so a reader never maps a half-written file.
+    """
+    import pyarrow as pa
+
+    table = _items_table(items)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".arrow.tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def read_arrow(path):
+    """Memory-maps an Arrow IPC file; the table's buffers point into the mapping instead of being read into memory."""
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def new_run_path(directory=RUNS_DIR):
+    """
+    A fresh runs/products-<ns timestamp>.arrow path for one app run. A mapped
+    file cannot be replaced or deleted on Windows while a reader holds its
+    table, so every run gets its own file instead of overwriting the last one.
+    """
+    return os.path.join(directory, f"products-{time.time_ns()}.arrow")
+
+
+def run_files(directory=RUNS_DIR):
+    """The per-run Arrow files in `directory`, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.startswith("products-") and name.endswith(".arrow")]
+    # Fixed-width nanosecond timestamps sort chronologically by name
+    return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+
+def prune_runs(directory=RUNS_DIR, keep=8):
+    """Deletes all but the newest `keep` run files. A file that is still mapped (Windows) is left for a later prune."""
+    removed = 0
+    for path in run_files(directory)[keep:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def benchmark(n=20000, rows=20, directory=None):
+    """
+    Time from a finished scrape to the first rendered page of rows: writing
+    and reading back the .xlsx (save_to_excel + pd.read_excel) against
+    writing and memory-mapping the .arrow file.
+    """
+    import pandas as pd
+    from exporter import save_to_excel
+
+    results = ResultSet(_synthetic_items(n))
+    directory = directory or tempfile.mkdtemp(prefix="handoff-")
+    excel_file = os.path.join(directory, "products.xlsx")
+    arrow_file = arrow_path(excel_file)
+
+    started = time.perf_counter()
+    save_to_excel(results, excel_file)
+    written = time.perf_counter()
+    frame = pd.read_excel(excel_file)
+    page = frame.iloc[:rows]
+    excel_times = (written - started, time.perf_counter() - written)
+
+    started = time.perf_counter()
+    write_arrow(results, arrow_file)
+    written = time.perf_counter()
+    table = read_arrow(arrow_file)
+    page = table.slice(0, rows).to_pandas()
+    arrow_times = (written - started, time.perf_counter() - written)
+
+    print(f"{n} items, first {len(page)} rows rendered")
+    print(f"  xlsx:  write {excel_times[0]:7.3f}s  read {excel_times[1]:7.3f}s  total {sum(excel_times):7.3f}s  ({os.path.getsize(excel_file) / 1e6:.1f} MB)")
+    print(f"  arrow: write {arrow_times[0]:7.3f}s  read {arrow_times[1]:7.3f}s  total {sum(arrow_times):7.3f}s  ({os.path.getsize(arrow_file) / 1e6:.1f} MB)")
+    print(f"  speedup: {sum(excel_times) / sum(arrow_times):.0f}x")
+    return excel_times, arrow_times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the xlsx and Arrow handoff from main.py to app.py")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic items to hand off")
+    args = parser.parse_args()
+    benchmark(args.rows)
@@ -0,0 +1,419 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def make_job_id(keyword, source, page):
+    """Deterministic job id so enqueueing the same keyword/source/page twice is a no-op."""
+    return f"{source}|{keyword.strip().lower()}|{page}"
+
+
+def build_jobs(keyword, sources, pages):
+    """Expands a keyword x sources x pages search into one job per results page."""
+    jobs = []
+    for source in sources:
+        for page in range(1, pages + 1):
+            jobs.append({
+                "id": make_job_id(keyword, source, page),
+                "keyword": keyword,
+                "source": source,
+                "page": page,
+            })
+    return jobs
+
+
+class JobQueue:
+    """
+    Interface for the shared scrape job queue.
+
+    A worker leases a job, keeps the lease alive with heartbeats while it
+    scrapes, then completes it with the scraped items. Results are stored per
+    job and replaced atomically on completion, and a completion is only
+    accepted from the current lease holder, so a job that is retried after an
+    expired or failed lease never produces duplicate rows.
+    """
+
+    def enqueue(self, jobs):
+        """Adds jobs, ignoring ids that already exist. Returns the number added."""
+        raise NotImplementedError
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Returns the next available job (with its 'lease_token') or None."""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id, lease_token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extends a lease. Returns False if the lease was lost to another worker."""
+        raise NotImplementedError
+
+    def complete(self, job_id, lease_token, items):
+        """Stores the job's items. Returns False if the lease is no longer held."""
+        raise NotImplementedError
+
+    def fail(self, job_id, lease_token, error):
+        """Releases the job for a retry, or marks it failed after max attempts."""
+        raise NotImplementedError
+
+    def release(self, job_id, lease_token, delay=0):
+        """Returns a job to the queue without counting the attempt, hidden for `delay` seconds."""
+        raise NotImplementedError
+
+    def results(self):
+        """Returns all stored items, ordered by source and page."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Returns a dict of job counts per status."""
+        raise NotImplementedError
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue with the same lease semantics, for tests and single-host runs."""
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.jobs = {}
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def enqueue(self, jobs):
+        added = 0
+        with self.lock:
+            for job in jobs:
+                if job["id"] in self.jobs:
+                    continue
+                self.jobs[job["id"]] = {
+                    **job,
+                    "status": "pending",
+                    "attempts": 0,
+                    "lease_token": None,
+                    "lease_expires": 0.0,
+                    "worker": None,
+                    "error": None,
+                }
+                added += 1
+        return added
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        with self.lock:
+            for job in self.jobs.values():
+                # For pending jobs lease_expires doubles as a "not before" time set by release()
+                available = job["status"] in ("pending", "leased") and job["lease_expires"] < now
+                if not available:
+                    continue
+                if job["attempts"] >= self.max_attempts:
+                    # Lease expired on the last allowed attempt
+                    job["status"] = "failed"
+                    job["error"] = job["error"] or "lease expired"
+                    continue
+                job["status"] = "leased"
+                job["attempts"] += 1
+                job["lease_token"] = uuid.uuid4().hex
+                job["lease_expires"] = now + lease_seconds
+                job["worker"] = worker_id
+                return dict(job)
+        return None
+
+    def heartbeat(self, job_id, lease_token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "leased" or job["lease_token"] != lease_token:
+                return False
+            job["lease_expires"] = time.time() + lease_seconds
+            return True
+
+    def complete(self, job_id, lease_token, items):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "leased" or job["lease_token"] != lease_token:
+                return False
+            self.items[job_id] = [dict(item) for item in items]
+            job["status"] = "done"
+            job["lease_token"] = None
+            return True
+
+    def fail(self, job_id, lease_token, error):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["lease_token"] != lease_token:
+                return
+            job["status"] = "pending" if job["attempts"] < self.max_attempts else "failed"
+            job["lease_token"] = None
+            job["lease_expires"] = 0.0
+            job["error"] = str(error)
+
+    def release(self, job_id, lease_token, delay=0):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["lease_token"] != lease_token:
+                return
+            job["status"] = "pending"
+            job["attempts"] -= 1
+            job["lease_token"] = None
+            job["lease_expires"] = time.time() + delay
+
+    def results(self):
+        with self.lock:
+            ordered = sorted(self.items, key=lambda job_id: (self.jobs[job_id]["source"], self.jobs[job_id]["page"]))
+            return [item for job_id in ordered for item in self.items[job_id]]
+
+    def stats(self):
+        counts = {}
+        with self.lock:
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue stored in a single SQLite file, usable from several hosts that share
+    a filesystem. Every operation opens its own short-lived connection and
+    takes the write lock up front (BEGIN IMMEDIATE), so it is safe to call
+    from a heartbeat thread. WAL is deliberately not used because it does not
+    work over network filesystems.
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=60):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    keyword TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_token TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    error TEXT,
+                    updated REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    item TEXT NOT NULL,
+                    PRIMARY KEY (job_id, position)
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Transaction(conn)
+
+    def enqueue(self, jobs):
+        now = time.time()
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, keyword, source, page, updated) VALUES (?, ?, ?, ?, ?)",
+                [(job["id"], job["keyword"], job["source"], job["page"], now) for job in jobs],
+            )
+            return conn.total_changes - before
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        with self._connect() as conn:
+            # Leases that expired on their last allowed attempt will never be picked up again
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), lease_token = NULL, updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            # For pending jobs lease_expires doubles as a "not before" time set by release()
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('pending', 'leased') AND lease_expires < ? "
+                "AND attempts < ? ORDER BY attempts, source, page LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_token = ?, lease_expires = ?, worker = ?, updated = ? WHERE id = ?",
+                (token, now + lease_seconds, worker_id, now, row["id"]),
+            )
+            job = dict(row)
+            job.update({"status": "leased", "attempts": row["attempts"] + 1, "lease_token": token, "worker": worker_id})
+            return job
+
+    def heartbeat(self, job_id, lease_token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (now + lease_seconds, now, job_id, lease_token),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, lease_token, items):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', lease_token = NULL, error = NULL, updated = ? WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (now, job_id, lease_token),
+            )
+            if cursor.rowcount != 1:
+                return False
+            conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                "INSERT INTO results (job_id, position, item) VALUES (?, ?, ?)",
+                [(job_id, i, json.dumps(dict(item), ensure_ascii=False)) for i, item in enumerate(items)],
+            )
+            return True
+
+    def fail(self, job_id, lease_token, error):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "lease_token = NULL, lease_expires = 0, error = ?, updated = ? WHERE id = ? AND lease_token = ?",
+                (self.max_attempts, str(error), now, job_id, lease_token),
+            )
+
+    def release(self, job_id, lease_token, delay=0):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = attempts - 1, lease_token = NULL, lease_expires = ?, updated = ? "
+                "WHERE id = ? AND lease_token = ?",
+                (now + delay, now, job_id, lease_token),
+            )
+
+    def results(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.item FROM results r JOIN jobs j ON j.id = r.job_id ORDER BY j.source, j.page, r.position"
+            ).fetchall()
+        return [json.loads(row["item"]) for row in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class _Transaction:
+    """Context manager that runs a connection inside BEGIN IMMEDIATE ... COMMIT and closes it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.execute("COMMIT")
+            else:
+                self.conn.execute("ROLLBACK")
+        finally:
+            self.conn.close()
+        return False
+
+
+def open_queue(spec):
+    """
+    Opens a queue from a spec string: 'memory://' for the in-process queue,
+    otherwise a path (optionally prefixed with 'sqlite://') to a SQLite file.
+    """
+    if spec == "memory://":
+        return MemoryJobQueue()
+    if spec.startswith("sqlite://"):
+        spec = spec[len("sqlite://"):]
+    return SQLiteJobQueue(spec)
+
+
+class Worker:
+    """
+    Pulls page jobs from a queue and scrapes them, heartbeating the lease from
+    a background thread while the (blocking) scraper runs.
+    """
+
+    def __init__(self, queue, headless=True, use_proxy=False, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.queue = queue
+        self.headless = headless
+        self.use_proxy = use_proxy
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, idle_exit=True, poll_interval=10):
+        """Processes jobs until the queue is drained (or forever if idle_exit is False)."""
+        processed = 0
+        while True:
+            job = self.queue.lease(self.worker_id, self.lease_seconds)
+            if job is None:
+                if idle_exit:
+                    break
+                time.sleep(poll_interval)
+                continue
+            self.run_job(job)
+            processed += 1
+        self.logger.info(f"Worker {self.worker_id} finished after {processed} jobs. Queue: {self.queue.stats()}")
+        return processed
+
+    def run_job(self, job):
+        from scraper import get_scraper, source_label
+        from block_detector import SourceBlocked, circuit_breaker
+
+        self.logger.info(f"Leased {job['id']} (attempt {job['attempts']})")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+        heartbeat.start()
+        try:
+            scraper = get_scraper(job["source"], headless=self.headless, use_proxy=self.use_proxy)
+            items = scraper.scrape_search_results(job["keyword"], max_pages=1, start_page=job["page"])
+            if scraper.stats.get("failed_pages"):
+                # The page exhausted its in-process retries; let the queue retry it (possibly on another host)
+                raise RuntimeError(f"page failed after {scraper.stats['retries']} retries")
+            if scraper.stats.get("aborted"):
+                # e.g. the browser session could not be opened; an empty result must not complete the job
+                raise RuntimeError(f"scrape aborted: {scraper.stats['aborted']}")
+            items.fill("Source", source_label(job["source"]))
+        except SourceBlocked as e:
+            # Not the job's fault: put it back until the site's cool-down is over
+            self.logger.warning(f"Deferring {job['id']}: {e}")
+            self.queue.release(job["id"], job["lease_token"], delay=circuit_breaker.remaining(job["source"]))
+            return False
+        except Exception as e:
+            self.logger.error(f"Job {job['id']} failed: {e}")
+            self.queue.fail(job["id"], job["lease_token"], e)
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        if self.queue.complete(job["id"], job["lease_token"], items):
+            self.logger.info(f"Completed {job['id']} with {len(items)} items")
+            return True
+        self.logger.warning(f"Lease for {job['id']} was lost; discarding {len(items)} items")
+        return False
+
+    def _heartbeat(self, job, stop):
+        interval = max(self.lease_seconds / 3, 1)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job["id"], job["lease_token"], self.lease_seconds):
+                self.logger.warning(f"Heartbeat rejected for {job['id']}")
+                return
@@ -0,0 +1,391 @@
+"""
+Soak / scaling harness: runs N concurrent scrape jobs against a local mock
+retail site and reports how throughput, page latency and memory change as
+concurrency grows.
+
+    python loadtest.py --levels 1,2,4,8 --jobs 16 --pages 3 --latency 300 --failure-rate 0.05
+    python loadtest.py --levels 4 --duration 1800          # 30 minute soak at 4 jobs
+
+The mock site serves Newegg-shaped result pages, so the real NeweggScraper
+extraction, retry and block-handling code runs; only search_url points at
+localhost. Nothing is written to the normal selector cache, circuit breaker
+or browser profiles.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+MOCK_TITLES = [
+    "CORSAIR Vengeance 32GB (2 x 16GB) DDR5 6000 CL30 1.35V XMP Desktop Memory",
+    "G.SKILL Trident Z5 RGB 32GB (2 x 16GB) DDR5 6400 CL32 EXPO Desktop Memory",
+    "Kingston FURY Beast 16GB DDR5 5600 CL40 Desktop Memory",
+    "Crucial Pro 64GB (2 x 32GB) DDR5 5600 CL46 Desktop Memory",
+    "TEAMGROUP T-Force Delta RGB 32GB (2 x 16GB) DDR5 6000 CL38 Desktop Memory",
+]
+
+
+class MockSite:
+    """
+    Local HTTP server for Newegg-shaped search pages with injected latency
+    (mean +/- jitter ms), dropped connections (`failure_rate`) and captcha
+    pages (`captcha_rate`).
+    """
+
+    def __init__(self, cards=36, total_pages=100, latency=200, jitter=100, failure_rate=0.0, captcha_rate=0.0):
+        self.cards = cards
+        self.total_pages = total_pages
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.captcha_rate = captcha_rate
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def render(self, page):
+        cards = []
+        for i in range(self.cards):
+            item = f"N82E{16800000000 + page * 1000 + i}"
+            title = f"{MOCK_TITLES[i % len(MOCK_TITLES)]} #{page}-{i}"
+            cards.append(
+                f'<div class="item-cell"><a class="item-title" href="https://www.newegg.com/p/{item}">{title}</a>'
+                f'<a class="item-rating" title="Rating + 4.{i % 10}"></a>'
+                f'<ul><li class="price-current">$<strong>{50 + i}</strong><sup>.99</sup></li></ul></div>'
+            )
+        next_button = '<button title="Next">Next</button>' if page < self.total_pages else '<button title="Next" disabled>Next</button>'
+        return f"<html><head><title>Mock results</title></head><body>{''.join(cards)}{next_button}</body></html>"
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                delay = max(0, random.gauss(site.latency, site.jitter)) / 1000
+                time.sleep(delay)
+                roll = random.random()
+                if roll < site.failure_rate:
+                    # Drop the connection without a response: the browser sees a network error
+                    self.close_connection = True
+                    return
+                if roll < site.failure_rate + site.captcha_rate:
+                    body = '<html><body><div id="px-captcha"></div></body></html>'
+                else:
+                    query = parse_qs(urlsplit(self.path).query)
+                    body = site.render(int(query.get("page", ["1"])[0]))
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def _read_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _read_name(pid):
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return "?"
+
+
+def _tree_roots(parents, me):
+    """pid -> the direct child of `me` it descends from, i.e. the Playwright driver of its browser."""
+    roots = {}
+    for pid in parents:
+        node = pid
+        while parents.get(node) not in (me, None):
+            node = parents[node]
+        roots[pid] = node
+    return roots
+
+
+def process_rss():
+    """
+    Returns (python_rss, children) in bytes: this process, and {pid: (tree,
+    name, rss)} for each of its descendants (driver, Chromium browser and its
+    renderers). `tree` is the driver the process belongs to, one per browser.
+    """
+    try:
+        import psutil
+        me = psutil.Process()
+        parents, details = {}, {}
+        for child in me.children(recursive=True):
+            try:
+                parents[child.pid] = child.ppid()
+                details[child.pid] = (child.name(), child.memory_info().rss)
+            except psutil.Error:
+                pass
+        roots = _tree_roots(parents, me.pid)
+        return me.memory_info().rss, {pid: (roots[pid], *details[pid]) for pid in details}
+    except ImportError:
+        pass
+
+    if not os.path.isdir("/proc"):
+        return None, None
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name may contain spaces; ppid follows the closing parenthesis
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    me = os.getpid()
+    descendants, frontier = {}, [me]
+    while frontier:
+        parent = frontier.pop()
+        children = [pid for pid, ppid in parents.items() if ppid == parent]
+        descendants.update((pid, parent) for pid in children)
+        frontier.extend(children)
+    roots = _tree_roots(descendants, me)
+    return _read_rss(me), {pid: (roots[pid], _read_name(pid), _read_rss(pid)) for pid in descendants}
+
+
+class RSSSampler:
+    """Background thread sampling Python RSS and the RSS of each browser process every `interval` seconds."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.started = time.time()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            python_rss, children = process_rss()
+            if python_rss is not None:
+                self.samples.append((round(time.time() - self.started, 1), python_rss, children))
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return self.samples
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_scraper(base_url, latencies, lock):
+    """A NeweggScraper pointed at the mock site that records every page attempt's latency."""
+    from scraper import NeweggScraper
+
+    class MockNeweggScraper(NeweggScraper):
+        site = "loadtest"
+        name = "Mock Newegg"
+        page_delay = (0, 0)
+        error_screenshot = None
+
+        def search_url(self, keyword, page=1):
+            return f"{base_url}/p/pl?d={keyword.replace(' ', '+')}&page={page}"
+
+        def scrape_page(self, keyword, page_num, first):
+            started = time.perf_counter()
+            try:
+                return super().scrape_page(keyword, page_num, first)
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+    return MockNeweggScraper(headless=True, use_proxy=False)
+
+
+def run_level(site, concurrency, jobs=None, duration=None, pages=3, rss_interval=1.0):
+    """Runs one concurrency level, either a fixed number of jobs or for `duration` seconds."""
+    latencies, totals = [], {"jobs": 0, "pages": 0, "failed_pages": 0, "retries": 0, "items": 0, "errors": 0}
+    lock = threading.Lock()
+    remaining = [jobs or 0]
+    deadline = time.time() + duration if duration else None
+
+    def next_job():
+        with lock:
+            if deadline is not None:
+                return time.time() < deadline
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker():
+        while next_job():
+            scraper = make_scraper(site.base_url, latencies, lock)
+            try:
+                items = scraper.scrape_search_results("ddr5 ram", max_pages=pages)
+                error = 0
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Load test job failed: {e}")
+                items, error = [], 1
+            with lock:
+                totals["jobs"] += 1
+                totals["items"] += len(items)
+                totals["errors"] += error
+                for key in ("pages", "failed_pages", "retries"):
+                    totals[key] += scraper.stats.get(key, 0)
+
+    tracemalloc_before = tracemalloc.get_traced_memory()[0]
+    sampler = RSSSampler(rss_interval).start()
+    started = time.time()
+    threads = [threading.Thread(target=worker, name=f"loadtest-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+    samples = sampler.stop()
+    tracemalloc_after = tracemalloc.get_traced_memory()[0]
+
+    return {
+        "concurrency": concurrency,
+        **totals,
+        "seconds": round(elapsed, 1),
+        "pages_per_min": round(totals["pages"] / elapsed * 60, 1) if elapsed else 0.0,
+        "p50_page_seconds": round(percentile(latencies, 0.5) or 0, 2),
+        "p99_page_seconds": round(percentile(latencies, 0.99) or 0, 2),
+        "peak_python_rss_mb": round(max((s[1] for s in samples), default=0) / 1e6, 1),
+        "peak_browser_rss_mb": round(max((sum(rss for _, _, rss in s[2].values()) for s in samples), default=0) / 1e6, 1),
+        "peak_per_browser_rss_mb": round(max((max(_browser_totals(s[2]).values(), default=0) for s in samples), default=0) / 1e6, 1),
+        "tracemalloc_growth_mb": round((tracemalloc_after - tracemalloc_before) / 1e6, 2),
+        "rss_timeline": [_timeline_entry(t, python, children) for t, python, children in samples],
+    }
+
+
+def _browser_totals(children):
+    """Sums per-process RSS into one figure per browser (driver process tree)."""
+    totals = {}
+    for tree, _, rss in children.values():
+        totals[tree] = totals.get(tree, 0) + rss
+    return totals
+
+
+def _timeline_entry(t, python, children):
+    return {
+        "t": t,
+        "python_mb": round(python / 1e6, 1),
+        "browser_mb": round(sum(rss for _, _, rss in children.values()) / 1e6, 1),
+        "browsers_mb": {str(tree): round(rss / 1e6, 1) for tree, rss in _browser_totals(children).items()},
+        "processes": {str(pid): {"browser": tree, "name": name, "mb": round(rss / 1e6, 1)} for pid, (tree, name, rss) in children.items()},
+    }
+
+
+def find_knee(levels):
+    """First level where adding concurrency buys <10% throughput or doubles p99 latency."""
+    for previous, current in zip(levels, levels[1:]):
+        if current["pages_per_min"] < previous["pages_per_min"] * 1.1:
+            return current["concurrency"], "throughput stopped growing"
+        if levels[0]["p99_page_seconds"] and current["p99_page_seconds"] > 2 * levels[0]["p99_page_seconds"]:
+            return current["concurrency"], "p99 latency doubled"
+    return None, None
+
+
+def print_report(report):
+    print(f"\n{'jobs':>5} {'conc':>5} {'pages':>6} {'failed':>6} {'pages/min':>10} {'p50 s':>7} {'p99 s':>7} {'py RSS MB':>10} {'browser MB':>11} {'per browser':>12} {'tracemalloc MB':>15}")
+    for level in report["levels"]:
+        print(
+            f"{level['jobs']:>5} {level['concurrency']:>5} {level['pages']:>6} {level['failed_pages']:>6} "
+            f"{level['pages_per_min']:>10} {level['p50_page_seconds']:>7} {level['p99_page_seconds']:>7} "
+            f"{level['peak_python_rss_mb']:>10} {level['peak_browser_rss_mb']:>11} {level['peak_per_browser_rss_mb']:>12} {level['tracemalloc_growth_mb']:>15}"
+        )
+    if report["knee"]:
+        print(f"\nScaling knee at concurrency {report['knee']}: {report['knee_reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak and scaling test against a local mock retail site")
+    parser.add_argument("--levels", type=str, default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--jobs", type=int, default=8, help="Jobs per level (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run each level for this many seconds instead of a fixed job count (soak)")
+    parser.add_argument("--pages", type=int, default=3, help="Result pages per job")
+    parser.add_argument("--cards", type=int, default=36, help="Cards per mock page")
+    parser.add_argument("--latency", type=float, default=200, help="Mean mock response latency (ms)")
+    parser.add_argument("--jitter", type=float, default=100, help="Latency standard deviation (ms)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with a dropped connection")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Fraction of requests answered with a captcha page")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="Seconds between RSS samples")
+    parser.add_argument("--output", type=str, default="loadtest_report.json", help="JSON report path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Keep harness state out of the real caches, profiles and breaker
+    import browser_profiles
+    from block_detector import circuit_breaker
+    from selector_cache import selector_cache
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    browser_profiles.REUSE_PROFILES = False
+    circuit_breaker.path = os.path.join(workdir, "circuit_breaker.json")
+    circuit_breaker.threshold = 10 ** 9
+    selector_cache.path = os.path.join(workdir, "selector_cache.json")
+
+    site = MockSite(cards=args.cards, latency=args.latency, jitter=args.jitter,
+                    failure_rate=args.failure_rate, captcha_rate=args.captcha_rate).start()
+    tracemalloc.start()
+    levels = []
+    try:
+        for concurrency in [int(level) for level in args.levels.split(",")]:
+            print(f"Running concurrency {concurrency}...")
+            levels.append(run_level(site, concurrency, jobs=args.jobs, duration=args.duration,
+                                    pages=args.pages, rss_interval=args.rss_interval))
+    finally:
+        tracemalloc.stop()
+        site.stop()
+
+    knee, reason = find_knee(levels)
+    report = {
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "levels": levels,
+        "knee": knee,
+        "knee_reason": reason,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nFull report with RSS timelines: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
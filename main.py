@@ -1,70 +1,272 @@
 import argparse
-from scraper import AmazonScraper
+from scraper import get_scraper, source_label
 from exporter import save_to_excel
+from block_detector import SourceBlocked
+from records import ResultSet
 import logging
+import time
+from contextlib import nullcontext
 
 def main():
     parser = argparse.ArgumentParser(description="Amazon Scraper with Proxy Rotation")
-    parser.add_argument("--keyword", type=str, required=True, help="Search keyword")
+    parser.add_argument("--keyword", type=str, help="Search keyword")
     parser.add_argument("--pages", type=int, default=1, help="Number of pages to scrape")
     parser.add_argument("--headless", action="store_true", help="Run in headless mode")
-    parser.add_argument("--no-proxy", action="store_true", help="Disable proxy usage")
+    parser.add_argument("--proxy", action="store_true", help="Route browsers through the free public proxy pool (off by default)")
+    parser.add_argument("--no-proxy", action="store_true", help="Run without proxies (the default; kept for existing scripts)")
     parser.add_argument("--source", type=str, default="amazon", choices=["amazon", "newegg", "bestbuy", "bh", "pchome", "all"], help="Source to scrape")
     parser.add_argument("--output", type=str, default="products.xlsx", help="Output file name")
+    parser.add_argument("--arrow", type=str, nargs="?", const="", help="Also write the results as an Arrow IPC file for app.py to memory-map (default: the output name with .arrow)")
+    parser.add_argument("--no-excel", action="store_true", help="Skip the Excel export (e.g. when --arrow is the handoff)")
+    parser.add_argument("--dataset", type=str, nargs="?", const="dataset", help="Also append the run to this Parquet dataset (partitioned by date and source)")
+    parser.add_argument("--diff", type=str, nargs="?", const="snapshots", help="Compare the run with the previous one for the same keyword (snapshots kept in this directory) and write <output>_changes.csv")
+    parser.add_argument("--profile", action="store_true", help="Profile the run and write cProfile/flamegraph data next to the output file")
+    parser.add_argument("--queue", type=str, help="Shared job queue (SQLite file path, or memory://) for distributed runs")
+    parser.add_argument("--enqueue", action="store_true", help="Add keyword x source x page jobs to --queue and exit")
+    parser.add_argument("--worker", action="store_true", help="Run as a worker that pulls jobs from --queue")
+    parser.add_argument("--collect", action="store_true", help="Export the results stored in --queue to --output")
+    parser.add_argument("--lease-seconds", type=int, default=300, help="Worker job lease duration")
+    parser.add_argument("--wait", action="store_true", help="Worker keeps polling instead of exiting when the queue is empty")
+    parser.add_argument("--fresh-profile", action="store_true", help="Don't reuse the saved per-site browser profile and session")
+    parser.add_argument("--enrich", action="store_true", help="Open product detail pages to fill specs (Voltage, CL, XMP/EXPO) from spec tables")
+    parser.add_argument("--enrich-tabs", type=int, default=4, help="Number of concurrent tabs for --enrich")
+    parser.add_argument("--enrich-ttl-hours", type=float, default=168, help="How long enriched product details stay cached")
+    parser.add_argument("--watchlist", type=str, help="File of product URLs (or site:id lines) to monitor for price/stock changes")
+    parser.add_argument("--watch-interval", type=float, default=60, help="Minutes between checks of each watched product")
+    parser.add_argument("--watch-workers", type=int, default=16, help="Concurrent HTTP checks in watchlist mode")
+    parser.add_argument("--watch-once", action="store_true", help="Check the watchlist once and exit")
+    parser.add_argument("--changes-output", type=str, default="price_changes.csv", help="CSV that watchlist price/stock changes are appended to")
+    parser.add_argument("--schedule", type=str, help="JSON file of recurring scrapes (keyword, sources, pages, interval_minutes) to run as a daemon")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="Scheduled runs that may execute at the same time")
+    parser.add_argument("--per-site", type=int, default=1, help="Scheduled runs that may scrape the same site at the same time")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random start-time jitter as a fraction of each interval")
+    parser.add_argument("--show-schedule", action="store_true", help="Print the running scheduler's next-run queue and exit")
+    parser.add_argument("--archive", type=str, nargs="?", const="page_archive", help="Store every fetched results page (compressed, deduplicated) in this directory")
+    parser.add_argument("--reprocess", type=str, nargs="?", const="all", choices=["amazon", "newegg", "bestbuy", "bh", "pchome", "all"], help="Re-extract the pages in --archive (optionally one source) with the current parsers and export to --output")
+    parser.add_argument("--processes", type=int, help="Processes for --reprocess (default: all cores)")
+    parser.add_argument("--latest", action="store_true", help="With --reprocess, only re-extract the most recent fetch of each archived search page")
+    parser.add_argument("--ssr", type=str, nargs="?", const="all", help="Load results with JavaScript disabled for these sites (comma-separated; default: all server-rendered sites)")
+    parser.add_argument("--capture-api", action="store_true", help="Build items from the sites' search API JSON when seen during page loads, falling back to the DOM")
+    parser.add_argument("--trace-sample", type=float, default=0.0, help="Fraction of results pages to record a Playwright trace for (0-1)")
+    parser.add_argument("--trace-slow", type=float, help="Always keep the trace of pages slower than this many seconds")
+    parser.add_argument("--trace-har", action="store_true", help="With tracing on, also record a HAR per browser session (kept only if one of its pages was traced)")
+    parser.add_argument("--shard", action="store_true", help="Split the search into price-range shards (site URL filters), crawl them in parallel and split shards that hit the page cap")
+    parser.add_argument("--shard-prices", type=str, default="0,50,100,150,250,500", help="Initial shard boundaries in USD for --shard; the last shard is open-ended")
+    parser.add_argument("--shard-workers", type=int, default=4, help="Shards crawled at the same time")
+    parser.add_argument("--sort", type=str, choices=["price"], help="Request results sorted by ascending price where the site supports it")
+    parser.add_argument("--top-k", type=int, help="Keep only the K cheapest items across sources (with --sort price, sources stop paginating once they cannot beat the K-th price)")
+    parser.add_argument("--deadline", type=float, help="Time budget in seconds for the whole scrape; sources stop with partial results when it runs out")
+    parser.add_argument("--page-deadline", type=float, default=120, help="Seconds one attempt at a results page may take, extraction included")
+    parser.add_argument("--action-timeout", type=float, default=5, help="Cap in seconds on a single browser action (reading a card field, waiting for an element)")
+    parser.add_argument("--artifacts", type=str, default="artifacts", help="Directory for per-job traces, HAR files and error screenshots")
     
     args = parser.parse_args()
     
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
     
+    if (args.enqueue or args.worker or args.collect) != bool(args.queue):
+        parser.error("--queue must be combined with --enqueue, --worker and/or --collect")
+    if args.show_schedule:
+        from scheduler import print_state
+        print_state()
+        return
+    if not (args.worker or args.collect or args.watchlist or args.schedule or args.reprocess) and not args.keyword:
+        parser.error("--keyword is required")
+    if args.top_k is not None and (args.top_k < 1 or args.sort != "price" or args.shard or args.queue):
+        parser.error("--top-k needs a positive K and --sort price, and cannot be combined with --shard or --queue")
+    if args.profile and args.shard:
+        # The profiler samples the main thread only, and sharded crawls scrape on worker threads
+        parser.error("--profile cannot be combined with --shard; profile an unsharded run instead")
+    
+    if args.fresh_profile:
+        import browser_profiles
+        browser_profiles.REUSE_PROFILES = False
+    
+    if args.reprocess:
+        from archive import reprocess
+        # --keyword narrows the reprocessed pages to one search
+        source = args.reprocess if args.reprocess != "all" else None
+        results = reprocess(args.archive or "page_archive", source=source, keyword=args.keyword, workers=args.processes, latest=args.latest)
+        if results:
+            save_to_excel(results, args.output)
+        return
+    
+    if args.archive:
+        import archive
+        archive.enable(args.archive)
+    
+    if args.capture_api:
+        import scraper as scrapers
+        scrapers.CAPTURE_API = True
+    
+    if args.ssr:
+        from scraper import enable_ssr
+        logger.info(f"SSR mode (JavaScript disabled) for: {', '.join(sorted(enable_ssr(args.ssr)))}")
+    
+    import tracing
+    tracing.configure(sample=args.trace_sample, slow_seconds=args.trace_slow, har=args.trace_har, root=args.artifacts)
+    import scraper as scrapers
+    scrapers.BaseScraper.page_deadline = args.page_deadline
+    scrapers.BaseScraper.action_timeout = int(args.action_timeout * 1000)
+    
+    if args.schedule:
+        from scheduler import Scheduler, load_schedule
+        scheduler = Scheduler(load_schedule(args.schedule), max_concurrent=args.max_concurrent, per_site=args.per_site,
+                              jitter=args.jitter, headless=args.headless, use_proxy=args.proxy)
+        scheduler.run()
+        return
+    
+    if args.watchlist:
+        from watchlist import PriceMonitor, load_watchlist
+        entries = load_watchlist(args.watchlist)
+        logger.info(f"Monitoring {len(entries)} products from {args.watchlist} every {args.watch_interval:g} min")
+        monitor = PriceMonitor(entries, interval=args.watch_interval * 60, workers=args.watch_workers,
+                               headless=args.headless, changes_file=args.changes_output)
+        monitor.run(once=args.watch_once)
+        return
+    
     logger.info(f"Starting scraper for keyword: {args.keyword} from {args.source}")
     
-    all_results = []
+    all_results = ResultSet()
+    source_stats = {}
+    # Source labels whose results are incomplete; --diff keeps their previous snapshot entries
+    partial_sources = set()
+    job_deadline = time.time() + args.deadline if args.deadline else None
+    
+    profiler = None
+    if args.profile:
+        from profiler import ScrapeProfiler
+        profiler = ScrapeProfiler(args.output)
     
     sources_to_scrape = []
     if args.source == "all":
         sources_to_scrape = ["amazon", "newegg", "bestbuy", "bh", "pchome"]
     else:
         sources_to_scrape = [args.source]
+    
+    if args.queue:
+        from job_queue import open_queue, build_jobs, Worker
+        queue = open_queue(args.queue)
         
+        if args.enqueue:
+            added = queue.enqueue(build_jobs(args.keyword, sources_to_scrape, args.pages))
+            logger.info(f"Enqueued {added} new jobs. Queue: {queue.stats()}")
+            
+        if args.worker:
+            worker = Worker(queue, headless=args.headless, use_proxy=args.proxy, lease_seconds=args.lease_seconds)
+            with profiler.section("worker") if profiler else nullcontext():
+                worker.run(idle_exit=not args.wait)
+            
+        if not args.collect:
+            if profiler:
+                profiler.write_report()
+            return
+        
+        all_results = ResultSet(queue.results())
+        logger.info(f"Collected {len(all_results)} items from queue. Queue: {queue.stats()}")
+        sources_to_scrape = []
+        
+    if args.shard and sources_to_scrape:
+        from sharding import ShardedCrawl
+        bounds = [int(bound) for bound in args.shard_prices.split(",") if bound.strip()]
+        crawl = ShardedCrawl(args.keyword, sources_to_scrape, pages=args.pages, bounds=bounds, workers=args.shard_workers,
+                             headless=args.headless, use_proxy=args.proxy, deadline=job_deadline)
+        all_results.extend(crawl.run())
+        partial_sources |= crawl.partial_sources
+        sources_to_scrape = []
+    
+    top_k = None
+    if args.top_k:
+        from topk import TopK
+        top_k = TopK(args.top_k)
+    
     for source in sources_to_scrape:
         logger.info(f"Scraping source: {source}")
-        scraper = None
-        if source == "newegg":
-            from scraper import NeweggScraper
-            scraper = NeweggScraper(headless=args.headless, use_proxy=not args.no_proxy)
-        elif source == "bestbuy":
-            from scraper import BestBuyScraper
-            scraper = BestBuyScraper(headless=args.headless, use_proxy=not args.no_proxy)
-        elif source == "bh":
-            from scraper import BHScraper
-            scraper = BHScraper(headless=args.headless, use_proxy=not args.no_proxy)
-        elif source == "pchome":
-            from scraper import PCHomeScraper
-            scraper = PCHomeScraper(headless=args.headless, use_proxy=not args.no_proxy)
-        elif source == "amazon":
-            from scraper import AmazonScraper
-            scraper = AmazonScraper(headless=args.headless, use_proxy=not args.no_proxy)
+        scraper = get_scraper(source, headless=args.headless, use_proxy=args.proxy)
             
         if scraper:
+            scraper.price_sort = args.sort == "price"
+            if args.sort == "price" and not scraper.price_sort_param:
+                logger.info(f"{source} has no price sort; all {args.pages} pages will be scraped")
+            if top_k:
+                scraper.on_page = top_k.on_page(source, sorted_by_price=bool(scraper.price_sort_param), is_ad=scraper.is_ad)
             try:
-                data = scraper.scrape_search_results(args.keyword, max_pages=args.pages)
+                with profiler.section(source) if profiler else nullcontext():
+                    data = scraper.scrape_search_results(args.keyword, max_pages=args.pages, deadline=job_deadline)
                 # Add Source field
-                for item in data:
-                    item["Source"] = source.capitalize()
-                    if source == "bh": item["Source"] = "B&H"
-                    if source == "pchome": item["Source"] = "PCHome"
+                data.fill("Source", source_label(source))
                 
                 all_results.extend(data)
+                source_stats[source] = scraper.stats
                 logger.info(f"Found {len(data)} items from {source}")
+                if scraper.stats["failed_pages"] or scraper.stats.get("budget_hits") or scraper.stats.get("aborted"):
+                    partial_sources.add(source_label(source))
+            except SourceBlocked as e:
+                logger.warning(f"Skipping {source}: {e}")
+                partial_sources.add(source_label(source))
             except Exception as e:
                 logger.error(f"Error scraping {source}: {e}")
+                partial_sources.add(source_label(source))
+
+    if top_k:
+        all_results = top_k.results()
+        stops = ", ".join(f"{source} after page {page}" for source, page in top_k.early_stops.items())
+        logger.info(f"Kept the {len(all_results)} cheapest items" + (f"; stopped early: {stops}" if stops else ""))
+
+    for source, stats in source_stats.items():
+        logger.info(f"{source}: {stats['pages']} pages ok, {stats['failed_pages']} failed, {stats['retries']} retries, {stats['wasted_seconds']:.1f}s wasted on failed attempts")
+        for stage, hits in stats.get("budget_hits", {}).items():
+            logger.warning(f"{source}: {stage} deadline reached {hits} time(s); results are partial")
+        if stats.get("action_timeouts") or stats.get("card_errors"):
+            logger.info(f"{source}: skipped {stats.get('action_timeouts', 0)} cards on action timeouts and {stats.get('card_errors', 0)} on other errors")
+        if stats.get("duplicates"):
+            logger.info(f"{source}: skipped {stats['duplicates']} duplicate cards (same product ID already extracted this run)")
+        if args.capture_api:
+            logger.info(f"{source}: {stats['api_items']} items from search API responses, {stats['dom_items']} from the DOM")
+        if stats.get("ssr_fallbacks"):
+            logger.info(f"{source}: SSR self-check failed {stats['ssr_fallbacks']} time(s); fell back to full rendering")
+        for mode in ("ssr", "full"):
+            costs = [cost for cost in stats.get("page_costs", []) if cost["mode"] == mode]
+            if costs:
+                logger.info(
+                    f"{source} [{mode}]: {len(costs)} pages, "
+                    f"{sum(c['cpu_seconds'] for c in costs) / len(costs):.2f}s renderer CPU, "
+                    f"{sum(c['script_seconds'] for c in costs) / len(costs):.2f}s script, "
+                    f"{sum(c['heap_mb'] for c in costs) / len(costs):.1f} MB JS heap, "
+                    f"{sum(c['seconds'] for c in costs) / len(costs):.1f}s wall per page"
+                )
+        if stats.get("lazy_load_seconds"):
+            waits = stats["lazy_load_seconds"]
+            logger.info(f"{source}: lazy load took {sum(waits) / len(waits):.2f}s per page on average (max {max(waits):.2f}s)")
+
+    if all_results and args.enrich:
+        from enrichment import Enricher, DetailCache
+        enricher = Enricher(tabs=args.enrich_tabs, headless=args.headless, cache=DetailCache(ttl_hours=args.enrich_ttl_hours))
+        with profiler.section("enrich") if profiler else nullcontext():
+            enricher.enrich(all_results)
 
     if all_results:
         logger.info(f"Scraping complete. Total found {len(all_results)} items.")
-        save_to_excel(all_results, args.output)
+        with profiler.section("export") if profiler else nullcontext():
+            if args.arrow is not None:
+                from handoff import write_arrow, arrow_path
+                logger.info(f"Results written to {write_arrow(all_results, args.arrow or arrow_path(args.output))}")
+            if not args.no_excel:
+                save_to_excel(all_results, args.output)
+            if args.dataset:
+                from dataset import append_run
+                append_run(all_results, args.dataset, keyword=args.keyword)
+            if args.diff and args.keyword and top_k:
+                logger.warning("--diff is skipped for --top-k runs; they only keep the cheapest items")
+            elif args.diff and args.keyword:
+                from diff import diff_run
+                diff_run(all_results, args.keyword, args.output, root=args.diff, partial_sources=partial_sources)
     else:
         logger.warning("No data found.")
 
+    if profiler:
+        profiler.write_report()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Frames from these modules mean the main thread is blocked on the browser
+# (Playwright round-trips, waits) rather than running our own Python code.
+BROWSER_WAIT_MODULES = ("playwright", "greenlet")
+
+
+class StackSampler:
+    """
+    Samples the stack of a single thread at a fixed interval and keeps
+    collapsed ("folded") stack counts, the format read by flamegraph.pl,
+    speedscope and inferno.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.label = "main"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                module = frame.f_globals.get("__name__", "?")
+                names.append(f"{module}.{frame.f_code.co_name}")
+                frame = frame.f_back
+            names.append(self.label)
+            self.stacks[";".join(reversed(names))] += 1
+
+    def write_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def wait_ratio(self, label):
+        """Fraction of samples taken in `label` that were blocked in the browser driver."""
+        total = 0
+        waiting = 0
+        for stack, count in self.stacks.items():
+            if not stack.startswith(label + ";"):
+                continue
+            total += count
+            if any(f";{module}." in stack for module in BROWSER_WAIT_MODULES):
+                waiting += count
+        return waiting / total if total else 0.0
+
+
+class ScrapeProfiler:
+    """
+    Collects a cProfile dump per source, a sampled flamegraph for the whole run
+    and a wall-clock breakdown (browser wait vs Python CPU) per section.
+    Only the thread that creates it is profiled, so work done on other
+    threads (e.g. sharded crawls) is not covered.
+
+    Usage:
+        profiler = ScrapeProfiler("products.xlsx")
+        with profiler.section("amazon"):
+            ...
+        profiler.write_report()
+    """
+
+    def __init__(self, output_file, interval=0.005):
+        base, _ = os.path.splitext(output_file)
+        self.base_path = base
+        self.sections = {}
+        self.sampler = StackSampler(threading.get_ident(), interval=interval)
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def section(self, name):
+        profile = cProfile.Profile()
+        self.sampler.label = name
+        if self.sampler._thread is None:
+            self.sampler.start()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            self.sampler.label = "main"
+
+            prof_path = f"{self.base_path}.{name}.prof"
+            profile.dump_stats(prof_path)
+
+            stats = self.sections.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            stats["wall"] += wall
+            stats["cpu"] += cpu
+            stats["prof"] = prof_path
+
+    def write_report(self):
+        """Writes the folded stacks and a JSON summary next to the results and logs the breakdown."""
+        self.sampler.stop()
+
+        folded_path = f"{self.base_path}.profile.folded"
+        self.sampler.write_folded(folded_path)
+
+        summary = {}
+        self.logger.info("Profile breakdown (seconds):")
+        self.logger.info(f"{'section':<12}{'wall':>10}{'python cpu':>12}{'browser wait':>14}{'other wait':>12}")
+        for name, stats in self.sections.items():
+            idle = max(stats["wall"] - stats["cpu"], 0.0)
+            # Split off-CPU time between the browser driver and everything else
+            # (sleeps, proxy fetches, disk) using the sampled stacks.
+            browser_wait = idle * self.sampler.wait_ratio(name)
+            other_wait = idle - browser_wait
+            summary[name] = {
+                "wall_s": round(stats["wall"], 3),
+                "python_cpu_s": round(stats["cpu"], 3),
+                "browser_wait_s": round(browser_wait, 3),
+                "other_wait_s": round(other_wait, 3),
+                "cprofile": stats["prof"],
+            }
+            self.logger.info(f"{name:<12}{stats['wall']:>10.2f}{stats['cpu']:>12.2f}{browser_wait:>14.2f}{other_wait:>12.2f}")
+
+        summary_path = f"{self.base_path}.profile.json"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump({"sections": summary, "flamegraph": folded_path}, f, indent=2)
+
+        self.logger.info(f"Flamegraph stacks written to {folded_path}")
+        return summary
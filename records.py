@@ -0,0 +1,187 @@
+import random
+import sys
+import time
+import tracemalloc
+
+# Free-text columns that are nearly unique per item; everything else repeats
+# ("N/A", "No", brand names, speeds, source labels) and is pooled.
+UNIQUE_COLUMNS = ("Title", "Product Link", "Model")
+
+
+class Record:
+    """
+    Lightweight view of one row in a ResultSet. Reads and writes go straight
+    to the column buffers, so code written against item dicts (item.get,
+    item[key] = value, dict(item)) keeps working without a dict per row.
+    """
+    __slots__ = ("_results", "_row")
+
+    def __init__(self, results, row):
+        self._results = results
+        self._row = row
+
+    def __getitem__(self, key):
+        column = self._results.columns[key]
+        return column[self._row]
+
+    def get(self, key, default=None):
+        column = self._results.columns.get(key)
+        if column is None or column[self._row] is None:
+            return default
+        return column[self._row]
+
+    def __setitem__(self, key, value):
+        self._results.set(self._row, key, value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        return [key for key, column in self._results.columns.items() if column[self._row] is not None]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+
+class ResultSet:
+    """
+    Column-oriented store for scraped items.
+
+    Each field is one list, in first-seen order, instead of a dict per item,
+    and repeated values are deduplicated through a per-set string pool, so a
+    large run holds one "N/A" object rather than millions. Iterating yields
+    Record views; to_dataframe() builds the DataFrame straight from the
+    columns, with repeated fields as categoricals.
+    """
+
+    def __init__(self, items=()):
+        self.columns = {}
+        self.length = 0
+        self.pool = {}
+        self.extend(items)
+
+    def _pooled(self, value):
+        if isinstance(value, str):
+            return self.pool.setdefault(value, value)
+        return value
+
+    def append(self, item):
+        """Adds one item (a dict or a Record); fields it lacks are left empty."""
+        for key in item.keys():
+            if key not in self.columns:
+                self.columns[key] = [None] * self.length
+        for key, column in self.columns.items():
+            value = item.get(key)
+            column.append(value if key in UNIQUE_COLUMNS else self._pooled(value))
+        self.length += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def set(self, row, key, value):
+        if key not in self.columns:
+            self.columns[key] = [None] * self.length
+        self.columns[key][row] = value if key in UNIQUE_COLUMNS else self._pooled(value)
+
+    def fill(self, key, value):
+        """Sets `key` to the same value on every item (e.g. the Source column)."""
+        self.columns[key] = [self._pooled(value)] * self.length
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.length
+        if not 0 <= row < self.length:
+            raise IndexError(row)
+        return Record(self, row)
+
+    def __iter__(self):
+        for row in range(self.length):
+            yield Record(self, row)
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+    def to_dataframe(self):
+        """Builds a DataFrame column by column, without materializing rows."""
+        import pandas as pd
+        data = {}
+        for key, column in self.columns.items():
+            data[key] = column if key in UNIQUE_COLUMNS else pd.Categorical(column)
+        return pd.DataFrame(data)
+
+
+def _synthetic_items(n, seed=0):
+    """Items shaped like scraper output. Values are rebuilt per item, as inner_text() returns new strings."""
+    rng = random.Random(seed)
+    brands = ["Corsair", "G.Skill", "Kingston", "Crucial", "TEAMGROUP", "N/A"]
+    speeds = ["4800 MHz", "5600 MHz", "6000 MHz", "6400 MHz", "N/A"]
+    for i in range(n):
+        brand = rng.choice(brands)
+        yield {
+            "Brand": "".join(brand),
+            "Model": f"Vengeance {i % 500}",
+            "Capacity": "".join(rng.choice(["16GB", "32GB", "64GB", "N/A"])),
+            "Speed": "".join(rng.choice(speeds)),
+            "CL_Timing": "".join(rng.choice(["CL30", "CL36", "CL40", "N/A"])),
+            "Voltage": "".join(rng.choice(["1.35V", "1.1V", "N/A"])),
+            "XMP_Support": "".join(rng.choice(["Yes", "No"])),
+            "EXPO_Support": "".join(rng.choice(["Yes", "No"])),
+            "RGB": "".join(rng.choice(["Yes", "No"])),
+            "Title": f"{brand} DDR5 32GB (2x16GB) 6000MHz CL30 Desktop Memory Kit #{i}",
+            "Price": f"${rng.randint(40, 400)}.{rng.randint(0, 99):02d}",
+            "Rating": "".join(rng.choice(["4.5 out of 5 stars", "4.7 out of 5 stars", "N/A"])),
+            "Product Link": f"https://www.example.com/dp/B{i:09d}",
+            "Source": "".join(rng.choice(["Amazon", "Newegg", "B&H"])),
+        }
+
+
+def _measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def benchmark(n=100000):
+    """Compares list-of-dicts against ResultSet memory for `n` synthetic items."""
+    dicts, dict_bytes, dict_peak, dict_seconds = _measure(lambda: list(_synthetic_items(n)))
+    del dicts
+    results, set_bytes, set_peak, set_seconds = _measure(lambda: ResultSet(_synthetic_items(n)))
+
+    print(f"{n} items")
+    print(f"  list of dicts: {dict_bytes / 1e6:8.1f} MB held ({dict_peak / 1e6:.1f} MB peak) in {dict_seconds:.2f}s")
+    print(f"  ResultSet:     {set_bytes / 1e6:8.1f} MB held ({set_peak / 1e6:.1f} MB peak) in {set_seconds:.2f}s")
+    print(f"  saving:        {100 * (1 - set_bytes / dict_bytes):.0f}%")
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return
+    _, frame_bytes, frame_peak, frame_seconds = _measure(results.to_dataframe)
+    print(f"  to_dataframe:  {frame_bytes / 1e6:8.1f} MB held ({frame_peak / 1e6:.1f} MB peak) in {frame_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
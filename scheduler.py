@@ -0,0 +1,274 @@
+import heapq
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from block_detector import SourceBlocked
+from browser_profiles import LAUNCH_ARGS
+from exporter import save_to_excel
+from records import ResultSet
+from scraper import get_scraper, source_label
+
+DEFAULT_STATE_FILE = "schedule_state.json"
+ALL_SOURCES = ["amazon", "newegg", "bestbuy", "bh", "pchome"]
+
+
+def load_schedule(path):
+    """
+    Reads recurring scrape definitions from a JSON list such as
+    [{"name": "ddr5", "keyword": "ddr5 ram", "sources": ["amazon", "newegg"],
+      "pages": 2, "interval_minutes": 60, "output": "ddr5.xlsx"}].
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        definitions = json.load(f)
+
+    names = set()
+    for definition in definitions:
+        if not definition.get("keyword"):
+            raise ValueError(f"Schedule entry without keyword: {definition}")
+        definition.setdefault("name", definition["keyword"])
+        if definition["name"] in names:
+            raise ValueError(f"Duplicate schedule name: {definition['name']}")
+        names.add(definition["name"])
+        sources = definition.get("sources", ["amazon"])
+        if isinstance(sources, str):
+            sources = [sources]
+        definition["sources"] = ALL_SOURCES if sources == "all" or sources == ["all"] else sources
+        unknown = [source for source in definition["sources"] if source not in ALL_SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown source(s) {', '.join(map(str, unknown))} in schedule entry '{definition['name']}'; expected {', '.join(ALL_SOURCES)}")
+        definition.setdefault("pages", 1)
+        definition.setdefault("interval_minutes", 60)
+        definition.setdefault("output", f"{definition['name'].replace(' ', '_')}.xlsx")
+    return definitions
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else None
+
+
+class WarmBrowser:
+    """
+    Playwright driver and Chromium kept running for the lifetime of a
+    scheduler worker thread, so runs open a context instead of cold-starting
+    a browser. Playwright's sync API is bound to the thread that started it,
+    hence one per worker.
+    """
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+
+    def get(self):
+        if self.browser is None or not self.browser.is_connected():
+            if self.playwright is None:
+                from playwright.sync_api import sync_playwright
+                self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        return self.browser
+
+    def close(self):
+        try:
+            if self.browser:
+                self.browser.close()
+        finally:
+            if self.playwright:
+                self.playwright.stop()
+            self.browser = None
+            self.playwright = None
+
+
+class Scheduler:
+    """
+    Long-running replacement for driving main.py from cron.
+
+    Each definition runs every `interval_minutes`, with start times jittered
+    by up to `jitter` of the interval so definitions with the same interval
+    do not fire together. At most `max_concurrent` runs execute at once and
+    at most `per_site` of them scrape the same site. A definition whose
+    previous run is still going is skipped for that tick rather than
+    stacked. Each run exports to its own output file (written to a temp file
+    and renamed), so runs never fight over one workbook.
+
+    The next-run queue, running definitions and last results are written to
+    `state_file` after every change; `main.py --show-schedule` prints it.
+    """
+
+    def __init__(self, definitions, max_concurrent=2, per_site=1, jitter=0.1, headless=True,
+                 use_proxy=False, state_file=DEFAULT_STATE_FILE):
+        self.definitions = {definition["name"]: definition for definition in definitions}
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.headless = headless
+        self.use_proxy = use_proxy
+        self.state_file = state_file
+        self.logger = logging.getLogger(__name__)
+
+        self.lock = threading.Lock()
+        self.site_slots = {site: threading.BoundedSemaphore(per_site) for site in ALL_SOURCES}
+        self.work = queue.Queue()
+        self.stop_event = threading.Event()
+        self.running = {}
+        self.last_runs = {}
+        self.skipped = {}
+
+        # First runs are spread over the jitter window instead of all starting at once
+        now = time.time()
+        self.next_runs = [
+            (now + random.uniform(0, self.jitter * self.interval(name)), name) for name in self.definitions
+        ]
+        heapq.heapify(self.next_runs)
+
+    def interval(self, name):
+        return self.definitions[name]["interval_minutes"] * 60
+
+    def next_time(self, name, now):
+        interval = self.interval(name)
+        return now + interval + random.uniform(-self.jitter, self.jitter) * interval
+
+    def snapshot(self):
+        """Current queue and run state as a JSON-friendly dict."""
+        with self.lock:
+            return {
+                "updated": format_time(time.time()),
+                "queue": [
+                    {"name": name, "next_run": format_time(at), "in_seconds": round(max(0, at - time.time()))}
+                    for at, name in sorted(self.next_runs)
+                ],
+                "running": [
+                    {"name": name, "started": format_time(started)} for name, started in self.running.items()
+                ],
+                "last_runs": dict(self.last_runs),
+                "skipped_overlaps": dict(self.skipped),
+            }
+
+    def write_state(self):
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def dispatch_due(self):
+        """Hands every due definition to the workers and reschedules it. Returns seconds until the next one."""
+        now = time.time()
+        changed = False
+        with self.lock:
+            while self.next_runs and self.next_runs[0][0] <= now:
+                _, name = heapq.heappop(self.next_runs)
+                heapq.heappush(self.next_runs, (self.next_time(name, now), name))
+                changed = True
+                if name in self.running:
+                    self.skipped[name] = self.skipped.get(name, 0) + 1
+                    self.logger.warning(f"Skipping scheduled run '{name}': previous run still in progress")
+                    continue
+                self.running[name] = now
+                self.work.put(name)
+            delay = self.next_runs[0][0] - now if self.next_runs else 60
+        if changed:
+            self.write_state()
+        return max(0.5, delay)
+
+    def execute(self, name, warm):
+        """Runs one definition on the worker's warm browser and exports its results."""
+        definition = self.definitions[name]
+        started = time.time()
+        results = ResultSet()
+        failed = []
+        self.logger.info(f"Scheduled run '{name}' started: {definition['keyword']} on {', '.join(definition['sources'])}")
+
+        for source in definition["sources"]:
+            with self.site_slots[source]:
+                try:
+                    scraper = get_scraper(source, headless=self.headless, use_proxy=self.use_proxy, browser=warm.get())
+                    data = scraper.scrape_search_results(definition["keyword"], max_pages=definition["pages"])
+                    data.fill("Source", source_label(source))
+                    results.extend(data)
+                except SourceBlocked as e:
+                    self.logger.warning(f"'{name}': skipping {source}: {e}")
+                    failed.append(source)
+                except Exception as e:
+                    self.logger.error(f"'{name}': error scraping {source}: {e}")
+                    failed.append(source)
+
+        if results:
+            output = definition["output"]
+            # Readers (e.g. the UI) never see a half-written workbook
+            tmp_output = f"{os.path.splitext(output)[0]}.partial.xlsx"
+            save_to_excel(results, tmp_output)
+            if os.path.exists(tmp_output):
+                os.replace(tmp_output, output)
+
+        elapsed = time.time() - started
+        self.logger.info(f"Scheduled run '{name}' finished: {len(results)} items in {elapsed:.0f}s")
+        return {
+            "started": format_time(started),
+            "seconds": round(elapsed, 1),
+            "items": len(results),
+            "failed_sources": failed,
+        }
+
+    def worker_loop(self):
+        warm = WarmBrowser(headless=self.headless)
+        try:
+            while True:
+                name = self.work.get()
+                if name is None:
+                    return
+                try:
+                    summary = self.execute(name, warm)
+                except Exception as e:
+                    self.logger.error(f"Scheduled run '{name}' crashed: {e}")
+                    summary = {"error": str(e)}
+                with self.lock:
+                    self.running.pop(name, None)
+                    self.last_runs[name] = summary
+                self.write_state()
+        finally:
+            warm.close()
+
+    def run(self):
+        """Runs until interrupted (Ctrl+C)."""
+        workers = [threading.Thread(target=self.worker_loop, name=f"scheduler-{i}", daemon=True) for i in range(self.max_concurrent)]
+        for worker in workers:
+            worker.start()
+
+        self.logger.info(f"Scheduler started with {len(self.definitions)} definitions, {self.max_concurrent} concurrent runs")
+        self.write_state()
+        try:
+            while not self.stop_event.is_set():
+                # Wake at least every 30s so a stop request is noticed promptly
+                self.stop_event.wait(min(30, self.dispatch_due()))
+        except KeyboardInterrupt:
+            self.logger.info("Scheduler stopping; waiting for running scrapes to finish...")
+        finally:
+            self.stop_event.set()
+            for _ in workers:
+                self.work.put(None)
+            for worker in workers:
+                worker.join()
+            self.write_state()
+
+
+def print_state(path=DEFAULT_STATE_FILE):
+    """Prints the next-run queue written by a running scheduler."""
+    if not os.path.exists(path):
+        print(f"No scheduler state at {path}")
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+
+    print(f"Scheduler state (updated {state['updated']})")
+    for run in state["running"]:
+        print(f"  running  {run['name']:<24} since {run['started']}")
+    for run in state["queue"]:
+        print(f"  next     {run['name']:<24} at {run['next_run']} (in {run['in_seconds']}s)")
+    for name, summary in state["last_runs"].items():
+        print(f"  last     {name:<24} {summary}")
+    for name, count in state["skipped_overlaps"].items():
+        print(f"  skipped  {name:<24} {count} overlapping runs")
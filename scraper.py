@@ -1,6 +1,13 @@
 import re
 from proxy_manager import ProxyManager
-from playwright.sync_api import sync_playwright
+from selector_cache import selector_cache
+from browser_profiles import BrowserSession
+from block_detector import circuit_breaker, wait_and_classify, SourceBlocked, BLOCKED, EMPTY
+from records import ResultSet
+from archive import archive_page
+from tracing import PageTracer
+from canonical import canonical_url, product_id
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 try:
     from playwright_stealth import stealth_sync
 except ImportError:
@@ -8,6 +15,7 @@ except ImportError:
 import time
 import random
 import logging
+from contextlib import nullcontext
 
 def extract_model(title, brand):
     if not brand or brand == "N/A":
@@ -44,13 +52,641 @@ def extract_model(title, brand):
     
     return model if model else "N/A"
 
-class AmazonScraper:
-    def __init__(self, headless=True, use_proxy=True):
+def check_circuit(site):
+    """Raises SourceBlocked if the site's circuit breaker is open."""
+    if not circuit_breaker.allow(site):
+        raise SourceBlocked(f"{site} circuit breaker is open; retry in {int(circuit_breaker.remaining(site))}s")
+
+def rotate_after_block(site, session, proxy_manager, proxy, kind):
+    """
+    Records a block and burns the identity that got blocked: the saved
+    session/profile cookies are discarded and the proxy is dropped from the
+    pool, so the next attempt starts from a fresh context and proxy.
+    """
+    circuit_breaker.record_block(site, kind)
+    session.discard()
+    if proxy:
+        proxy_manager.remove_proxy(proxy)
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Exponential backoff with full jitter: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+# Scrolls in the page until the card count and page height stop growing. A
+# MutationObserver tracks both, so the loop ends `quietMs` after the last new
+# card (or layout growth) once the bottom is reached, rather than after a fixed
+# number of scrolls and sleeps or waiting for a network idle that ad-heavy
+# pages never reach.
+SCROLL_UNTIL_STABLE_JS = """
+async ({selector, step, quietMs, maxMs}) => {
+    const start = performance.now();
+    const count = () => document.querySelectorAll(selector).length;
+    let last = count();
+    let lastHeight = document.body.scrollHeight;
+    let lastChange = performance.now();
+    const observer = new MutationObserver(() => {
+        const current = count();
+        const height = document.body.scrollHeight;
+        if (current !== last || height !== lastHeight) {
+            last = current;
+            lastHeight = height;
+            lastChange = performance.now();
+        }
+    });
+    observer.observe(document.body, {childList: true, subtree: true});
+    try {
+        while (performance.now() - start < maxMs) {
+            const atBottom = window.innerHeight + window.scrollY >= document.body.scrollHeight - 2;
+            if (!atBottom) {
+                window.scrollBy(0, step);
+            } else if (performance.now() - lastChange >= quietMs) {
+                break;
+            }
+            await new Promise(resolve => setTimeout(resolve, 100));
+        }
+    } finally {
+        observer.disconnect();
+    }
+    return last;
+}
+"""
+
+def scroll_until_stable(page, card_selector, step=1500, quiet_ms=800, max_ms=15000):
+    """
+    Scrolls a lazy-loading results page until neither the card count nor the
+    page height has changed for `quiet_ms` at the bottom. Cards that arrive
+    after that (late XHRs) restart the scroll, all within one `max_ms`
+    deadline. Returns (card_count, seconds_taken).
+    """
+    started = time.time()
+    count = 0
+    while True:
+        remaining = max_ms - (time.time() - started) * 1000
+        if remaining <= 0:
+            break
+        count = page.evaluate(SCROLL_UNTIL_STABLE_JS, {"selector": card_selector, "step": step, "quietMs": quiet_ms, "maxMs": remaining})
+        if page.locator(card_selector).count() <= count:
+            break
+    return count, time.time() - started
+
+# Set by main.py --capture-api: build items from the sites' search API responses when possible
+CAPTURE_API = False
+
+# Sites to load with JavaScript disabled (main.py --ssr); each falls back to full rendering if its cards are missing
+SSR_SITES = set()
+
+# Resource types skipped in SSR mode; stylesheets stay because inner_text depends on layout
+SSR_BLOCKED_RESOURCES = ("image", "media", "font")
+
+def block_ssr_resources(route):
+    if route.request.resource_type in SSR_BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+def iter_dicts(payload):
+    """Yields every dict nested anywhere in a decoded JSON payload."""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def format_usd(value):
+    try:
+        return f"${float(str(value).replace(',', '').lstrip('$')):.2f}"
+    except (TypeError, ValueError):
+        return "N/A"
+
+# Outcomes of scraping one results page
+PAGE_OK = "ok"
+PAGE_EMPTY = "empty"
+PAGE_FAILED = "failed"
+PAGE_STOP = "stop"
+
+class PageBlocked(Exception):
+    """Raised when a results page turns out to be a captcha or access-denied wall."""
+
+    def __init__(self, kind):
+        super().__init__(f"page blocked ({kind})")
+        self.kind = kind
+
+class BaseScraper:
+    """
+    Shared page loop for the site scrapers.
+
+    Every results page is its own unit of work: it is loaded by URL, classified
+    and extracted, and a failure is retried up to `max_retries` times with
+    exponential backoff and a fresh browser context, instead of ending the
+    whole source. Subclasses provide search_url(), extract_cards() and
+    parse_specs(), and can override load_page() and has_next_page().
+    """
+    site = None
+    name = None
+    results_selector = None
+    locale = None
+    goto_timeout = 60000
+    # Cap on any single Playwright action (inner_text, get_attribute, waits) in ms; the default would be 30s
+    action_timeout = 5000
+    # Seconds one attempt at a results page may take, extraction included
+    page_deadline = 120
+    # Pause before loading each page after the first one
+    page_delay = (3, 6)
+    # Save a screenshot of the first failed attempt at each page to the job's artifact directory
+    error_screenshot = False
+    max_retries = 2
+    # Set when extracting from archived HTML: the DOM is final, so no scrolling or waiting
+    offline = False
+    # Regex matched against response URLs to find the site's search API payloads
+    api_pattern = None
+    # Results arrive in batches while scrolling, so the page must be scrolled before its API payloads are complete
+    lazy_loads = False
+    # Results are server-rendered, so --ssr with no site list includes this site
+    ssr_capable = False
+    # Optional callback(page_num, items) run after each OK page; returning False stops pagination
+    on_page = None
+    # Query-string fragment that sorts results by ascending price, if the site has one
+    price_sort_param = None
+
+    def __init__(self, headless=True, use_proxy=False, browser=None):
         self.headless = headless
         self.use_proxy = use_proxy
+        # Already-running Browser to open contexts on (e.g. the scheduler's warm browser)
+        self.browser = browser
         self.proxy_manager = ProxyManager()
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO)
+        self.session = None
+        self.page = None
+        self.proxy = None
+        self.stats = {}
+        self.captured = []
+        # Distinct products found in the current page's API payloads, and whether its lazy batches were loaded
+        self.api_covered = 0
+        self.lazy_loaded = False
+        # Product IDs already extracted in this run
+        self.seen = set()
+        self.page_seen = set()
+        self.card_seen_key = None
+        # id() of the current page's items that came from sponsored cards (see is_ad)
+        self.page_ads = set()
+        self.playwright = None
+        self.cdp = None
+        self.ssr_active = self.site in SSR_SITES
+        # Absolute time.time() limits for the whole job and the current page attempt
+        self.job_deadline = None
+        self.page_deadline_at = None
+        # (low, high) USD bounds applied through the site's URL price filter (sharded crawls); high None = open-ended
+        self.price_range = None
+        # Request price-ascending results (price_sort_param) for --sort price
+        self.price_sort = False
+        # Trace/screenshot artifacts for the current scrape job
+        self.tracer = None
+        self.har_path = None
+
+    def validate_item(self, item, keyword):
+        """
+        Validates if the item matches the search keyword strictly.
+        Returns True if the item is valid, False otherwise.
+        """
+        title = item.get("Title", "").upper()
+        keyword_upper = keyword.upper()
+        
+        # Strict DDR generation filtering
+        if "DDR5" in keyword_upper and "DDR4" in title:
+            return False
+        if "DDR4" in keyword_upper and "DDR5" in title:
+            return False
+            
+        return True
+
+    def search_url(self, keyword, page=1):
+        raise NotImplementedError
+
+    def price_filter(self, low, high):
+        """Query-string fragment restricting results to a USD price range, or None if the site has no usable filter."""
+        return None
+
+    def filtered(self, url):
+        """Appends the price filter for self.price_range and the price sort, when set, to a search URL."""
+        if self.price_range is not None:
+            url += self.price_filter(*self.price_range)
+        if self.price_sort and self.price_sort_param:
+            url += self.price_sort_param
+        return url
+
+    def extract_cards(self, keyword):
+        """Extracts the valid items from the currently loaded results page."""
+        raise NotImplementedError
+
+    def prepare_context(self, session):
+        """Hook for per-site context setup such as cookies."""
+        pass
+
+    def api_record(self, record):
+        """Maps one dict from a search API payload to (title, price, rating, link), or None if it is not a product."""
+        return None
+
+    def card_key(self, card):
+        """Cheap product ID for a result card, read before any field extraction. Sites override this with a data attribute when they have one."""
+        link = card.locator("a[href]").first
+        if link.count() == 0:
+            return None
+        href = link.get_attribute("href")
+        return product_id(self.site, href) if href else None
+
+    def is_duplicate(self, card):
+        """
+        True if the card's product was already extracted in this run (sponsored
+        + organic copies, repeated pages). The key is only remembered by
+        mark_seen() once the card's item has been kept, so a card that fails
+        extraction does not hide a later copy.
+        """
+        self.card_seen_key = None
+        try:
+            key = self.card_key(card)
+        except Exception:
+            return False
+        if not key:
+            return False
+        if key in self.seen:
+            self.stats["duplicates"] = self.stats.get("duplicates", 0) + 1
+            return True
+        self.card_seen_key = key
+        return False
+
+    def mark_seen(self):
+        """Records the key of the card just checked by is_duplicate() after its item was appended."""
+        if self.card_seen_key:
+            self.seen.add(self.card_seen_key)
+            self.card_seen_key = None
+
+    def mark_ad(self, item):
+        """Flags an item of the current page as a sponsored placement, without adding a column."""
+        self.page_ads.add(id(item))
+
+    def is_ad(self, item):
+        """
+        True if the item came from a sponsored card on the page just scraped.
+        Ads are placed regardless of the requested sort order, so callers use
+        this to leave them out of price-order reasoning.
+        """
+        return id(item) in self.page_ads
+
+    def budget_ms(self, ms):
+        """Caps a Playwright timeout to what is left of the page deadline (never 0, which Playwright treats as no timeout)."""
+        if self.page_deadline_at is None:
+            return ms
+        return max(1000, min(ms, int((self.page_deadline_at - time.time()) * 1000)))
+
+    def start_page_budget(self):
+        self.page_deadline_at = time.time() + self.page_deadline
+        if self.job_deadline is not None:
+            self.page_deadline_at = min(self.page_deadline_at, self.job_deadline)
+        self.apply_action_timeout()
+
+    def apply_action_timeout(self):
+        if self.session:
+            self.session.context.set_default_timeout(self.budget_ms(self.action_timeout))
+
+    def job_expired(self):
+        return self.job_deadline is not None and time.time() >= self.job_deadline
+
+    def budget_hit(self, stage):
+        """Records that the page or job budget ran out."""
+        hits = self.stats.setdefault("budget_hits", {})
+        hits[stage] = hits.get(stage, 0) + 1
+        self.logger.warning(f"{self.name} hit its {stage} deadline; keeping partial results")
+
+    def out_of_time(self):
+        """Checked between cards: True once the page (or job) deadline has passed."""
+        if self.page_deadline_at is None or time.time() < self.page_deadline_at:
+            return False
+        self.budget_hit("job" if self.job_expired() else "page")
+        return True
+
+    def card_failed(self, error):
+        """Counts a card that could not be read; a Playwright timeout means the action cap cut a stalled call short."""
+        key = "action_timeouts" if isinstance(error, PlaywrightTimeoutError) else "card_errors"
+        self.stats[key] = self.stats.get(key, 0) + 1
+        self.logger.debug(f"Skipped a {self.name} card: {error}")
+
+    def on_response(self, response):
+        # Only keep the handle here; the body is read after the page has loaded
+        if self.api_pattern.search(response.url) and "json" in response.headers.get("content-type", ""):
+            self.captured.append(response)
+
+    def items_from_api(self, keyword):
+        """
+        Builds items from the search payloads captured during the page load,
+        or returns None if there were none usable. `api_covered` counts the
+        distinct products in the payloads, kept or not, to compare against
+        the page's cards.
+        """
+        results = []
+        covered = set()
+        for response in self.captured:
+            try:
+                payload = response.json()
+            except Exception as e:
+                self.logger.debug(f"Ignoring unreadable {self.name} API response {response.url}: {e}")
+                continue
+            for record in iter_dicts(payload):
+                fields = self.api_record(record)
+                if not fields:
+                    continue
+                title, price, rating, link = fields
+                key = product_id(self.site, link) or link
+                covered.add(key)
+                if key in self.seen:
+                    self.stats["duplicates"] = self.stats.get("duplicates", 0) + 1
+                    continue
+                self.seen.add(key)
+                item = {**self.parse_specs(title), "Title": title, "Price": price, "Rating": rating, "Product Link": link}
+                if self.validate_item(item, keyword):
+                    results.append(item)
+        self.api_covered = len(covered)
+        return results or None
+
+    def has_next_page(self):
+        return True
+
+    def wait_for_lazy_load(self):
+        """Scrolls until the card count stops growing (once per page) and records how long the page needed."""
+        if self.offline or self.ssr_active or self.lazy_loaded:
+            return
+        self.lazy_loaded = True
+        count, seconds = scroll_until_stable(self.page, self.results_selector, max_ms=self.budget_ms(15000))
+        self.stats.setdefault("lazy_load_seconds", []).append(seconds)
+        self.logger.info(f"Lazy load settled at {count} cards after {seconds:.2f}s")
+
+    def open_session(self, p):
+        self.proxy = None
+        if self.use_proxy:
+            self.proxy = self.proxy_manager.get_random_proxy()
+        if self.proxy:
+            self.logger.info(f"Using proxy: {self.proxy}")
+
+        self.playwright = p
+        self.har_path = self.tracer.har_path() if self.tracer else None
+        self.session = BrowserSession(p, self.site, headless=self.headless, locale=self.locale, proxy=self.proxy,
+                                      browser=self.browser, javascript=not self.ssr_active, har_path=self.har_path)
+        self.prepare_context(self.session)
+        if self.ssr_active:
+            # No page scripts run, so the stealth patches have nothing to hide
+            self.session.context.route("**/*", block_ssr_resources)
+            self.logger.info(f"Loading {self.name} with JavaScript disabled")
+        else:
+            stealth_sync(self.session.context)
+        self.page = self.session.context.new_page()
+        self.apply_action_timeout()
+        if self.tracer and self.tracer.enabled:
+            self.tracer.attach(self.session.context)
+        if CAPTURE_API and self.api_pattern:
+            self.page.on("response", self.on_response)
+
+        self.cdp = None
+        try:
+            self.cdp = self.session.context.new_cdp_session(self.page)
+            self.cdp.send("Performance.enable")
+        except Exception:
+            pass
+
+    def page_metrics(self):
+        """Cumulative renderer metrics for the page (Chromium DevTools), or None if unavailable."""
+        if self.cdp is None:
+            return None
+        try:
+            return {metric["name"]: metric["value"] for metric in self.cdp.send("Performance.getMetrics")["metrics"]}
+        except Exception:
+            return None
+
+    def record_page_cost(self, before, started):
+        """Stores the renderer CPU time and JS heap one page cost, tagged with the rendering mode."""
+        after = self.page_metrics()
+        if not before or not after:
+            return
+        self.stats.setdefault("page_costs", []).append({
+            "mode": "ssr" if self.ssr_active else "full",
+            "cpu_seconds": after.get("TaskDuration", 0) - before.get("TaskDuration", 0),
+            "script_seconds": after.get("ScriptDuration", 0) - before.get("ScriptDuration", 0),
+            "heap_mb": after.get("JSHeapUsedSize", 0) / 1e6,
+            "seconds": time.time() - started,
+        })
+
+    def fall_back_to_full_render(self, reason):
+        # The page is extracted again from scratch, so forget what this attempt recorded
+        self.seen = set(self.page_seen)
+        self.logger.warning(f"{self.name} SSR self-check failed ({reason}); falling back to full rendering")
+        self.ssr_active = False
+        self.stats["ssr_fallbacks"] = self.stats.get("ssr_fallbacks", 0) + 1
+        self.close_session()
+        self.open_session(self.playwright)
+
+    def close_session(self):
+        if self.session:
+            if self.tracer and self.tracer.enabled:
+                self.tracer.detach()
+            try:
+                self.session.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing {self.name} browser: {e}")
+            self.session = None
+            self.page = None
+            if self.tracer:
+                self.tracer.discard_har(self.har_path)
+        selector_cache.save()
+
+    def load_page(self, keyword, page_num, first):
+        """Navigates to a results page and returns its classification."""
+        if not first:
+            time.sleep(random.uniform(*self.page_delay))
+        response = self.page.goto(self.search_url(keyword, page_num), timeout=self.budget_ms(self.goto_timeout))
+        return wait_and_classify(self.page, self.results_selector, response, timeout=self.budget_ms(15000))
+
+    def scrape_page(self, keyword, page_num, first):
+        """One attempt at a results page. Returns the items, or None if the page has no results."""
+        self.logger.info(f"Scraping {self.name} page {page_num}...")
+        self.captured = []
+        self.api_covered = 0
+        self.lazy_loaded = False
+        self.page_ads = set()
+        started, before = time.time(), self.page_metrics()
+        page_status = self.load_page(keyword, page_num, first)
+        if page_status in BLOCKED:
+            raise PageBlocked(page_status)
+        if page_status == EMPTY and self.ssr_active:
+            # Self-check: no cards without JS may just mean the site needs scripts
+            self.fall_back_to_full_render("no result cards")
+            return self.scrape_page(keyword, page_num, first)
+        if page_status == EMPTY:
+            self.logger.warning(f"Timeout waiting for {self.name} results on page {page_num}. Maybe no more results.")
+            return None
+        circuit_breaker.record_success(self.site)
+
+        items = None
+        if self.captured:
+            if self.lazy_loads:
+                # Later batches are only requested, and captured, while the page scrolls
+                self.wait_for_lazy_load()
+            items = self.items_from_api(keyword)
+        if items is not None:
+            self.stats["api_items"] += len(items)
+            cards = self.page.locator(self.results_selector).count()
+            if self.api_covered < cards:
+                # The payloads did not cover the grid (e.g. a recommendations feed); cards missing from them
+                # come from the DOM, and is_duplicate skips the ones already built from the API
+                self.logger.info(f"{self.name} API payloads cover {self.api_covered} of {cards} cards; reading the rest from the DOM")
+                extra = self.extract_cards(keyword)
+                self.stats["dom_items"] += len(extra)
+                items.extend(extra)
+        else:
+            items = self.extract_cards(keyword)
+            if not items and self.ssr_active:
+                self.fall_back_to_full_render("cards without extractable items")
+                return self.scrape_page(keyword, page_num, first)
+            self.stats["dom_items"] += len(items)
+        self.record_page_cost(before, started)
+        self.finish_items(items)
+        # Archived after extraction so lazy-loaded cards are in the stored DOM
+        archive_page(self.page, self.site, keyword, page_num)
+        self.logger.info(f"Added {len(items)} valid items from page {page_num}")
+        return items
+
+    def finish_items(self, items):
+        """Post-processing shared by live scraping and archive reprocessing."""
+        # Tracking parameters and redirect wrappers are dropped from the exported links
+        for item in items:
+            item["Product Link"] = canonical_url(item.get("Product Link"), self.site) or item.get("Product Link", "N/A")
+        return items
+
+    def scrape_page_with_retry(self, p, keyword, page_num, first):
+        """
+        Scrapes one page with bounded retries. Returns (items, outcome) where
+        outcome is PAGE_OK, PAGE_EMPTY, PAGE_FAILED (retries exhausted) or
+        PAGE_STOP (circuit breaker opened).
+        """
+        attempt = 0
+        while True:
+            started = time.time()
+            traced = self.tracer is not None and self.tracer.enabled
+            if traced:
+                self.tracer.start_page(page_num)
+            self.start_page_budget()
+            # Products recorded by a failed attempt must not be skipped as duplicates on the retry
+            self.page_seen = set(self.seen)
+            try:
+                items = self.scrape_page(keyword, page_num, first)
+                if traced:
+                    self.tracer.finish_page(time.time() - started, attempt)
+                return items, PAGE_OK if items is not None else PAGE_EMPTY
+            except PageBlocked as e:
+                self.logger.warning(f"{self.name} served a {e.kind} page on page {page_num}. Rotating identity.")
+                rotate_after_block(self.site, self.session, self.proxy_manager, self.proxy, e.kind)
+                error = e
+            except Exception as e:
+                self.logger.warning(f"{self.name} page {page_num} attempt {attempt + 1} failed: {e}")
+                error = e
+            self.stats["wasted_seconds"] += time.time() - started
+            self.seen = self.page_seen
+            if traced:
+                self.tracer.finish_page(time.time() - started, attempt, failed=True)
+
+            if attempt == 0 and self.error_screenshot and self.page and self.tracer:
+                path = self.tracer.screenshot(self.page, page_num, attempt)
+                if path:
+                    self.logger.info(f"Screenshot saved to {path}")
+
+            if not circuit_breaker.allow(self.site):
+                self.logger.warning(f"{self.name} circuit breaker is open. Stopping.")
+                self.stats["failed_pages"] += 1
+                return None, PAGE_STOP
+            if attempt >= self.max_retries:
+                self.logger.error(f"Giving up on {self.name} page {page_num} after {attempt + 1} attempts: {error}")
+                self.stats["failed_pages"] += 1
+                return None, PAGE_FAILED
+
+            attempt += 1
+            delay = backoff_delay(attempt)
+            if self.job_deadline is not None and time.time() + delay >= self.job_deadline:
+                self.budget_hit("job")
+                self.stats["failed_pages"] += 1
+                return None, PAGE_STOP
+            self.stats["retries"] += 1
+            self.logger.info(f"Retrying {self.name} page {page_num} in {delay:.1f}s with a fresh context...")
+            time.sleep(delay)
+            self.stats["wasted_seconds"] += delay
+
+            # Start the retry from a fresh context (and proxy, if enabled)
+            self.close_session()
+            self.open_session(p)
+
+    def scrape_search_results(self, keyword, max_pages=1, start_page=1, deadline=None):
+        """Scrapes up to max_pages results pages; `deadline` (a time.time() value) bounds the whole job."""
+        check_circuit(self.site)
+        self.job_deadline = deadline
+        # Page item dicts are folded into column buffers as soon as each page is done
+        results = ResultSet()
+        last_page = start_page + max_pages - 1
+        self.stats = {"pages": 0, "failed_pages": 0, "retries": 0, "wasted_seconds": 0.0, "api_items": 0, "dom_items": 0, "duplicates": 0,
+                      "exhausted": False}
+        self.seen = set()
+        self.tracer = PageTracer(self.site)
+        
+        # A shared browser is already running, so there is no driver to start
+        with nullcontext() if self.browser else sync_playwright() as p:
+            try:
+                self.open_session(p)
+                self.logger.info(f"Navigating to {self.name}...")
+                
+                for current_page in range(start_page, last_page + 1):
+                    if self.job_expired():
+                        self.budget_hit("job")
+                        break
+                    items, outcome = self.scrape_page_with_retry(p, keyword, current_page, current_page == start_page)
+                    if outcome in (PAGE_EMPTY, PAGE_STOP):
+                        # Running out of results (rather than pages) tells sharded crawls not to split this range
+                        self.stats["exhausted"] = outcome == PAGE_EMPTY
+                        break
+                    if outcome == PAGE_OK:
+                        self.stats["pages"] += 1
+                        results.extend(items)
+                        self.logger.info(f"Total: {len(results)}")
+                        if self.on_page and self.on_page(current_page, items) is False:
+                            break
+                        # A failed page says nothing about pagination, so only an OK page can end it.
+                        # The last allowed page is checked too: a sharded crawl splits a range only if it has more pages
+                        if not self.has_next_page():
+                            self.stats["exhausted"] = True
+                            break
+            except Exception as e:
+                self.logger.error(f"{self.name} Error: {e}")
+                # The remaining pages were never tried; callers must not treat the results as complete
+                self.stats["aborted"] = str(e)
+            finally:
+                self.close_session()
+                self.page_deadline_at = None
+
+        self.logger.info(
+            f"{self.name}: {self.stats['pages']} pages scraped, {self.stats['failed_pages']} failed, "
+            f"{self.stats['retries']} retries, {self.stats['wasted_seconds']:.1f}s wasted"
+        )
+        return results
+
+class AmazonScraper(BaseScraper):
+    site = "amazon"
+    name = "Amazon"
+    results_selector = "div[data-component-type='s-search-result']"
+    locale = 'en-US'
+    ssr_capable = True
+    # Reduced timeout to 30 seconds to fail fast on bad proxies
+    goto_timeout = 30000
+    page_delay = (4, 8)
+    price_sort_param = "&s=price-asc-rank"
+    error_screenshot = True
 
     def parse_specs(self, title):
         specs = {
@@ -108,200 +744,136 @@ class AmazonScraper:
             
         return specs
 
-    def validate_item(self, item, keyword):
-        """
-        Validates if the item matches the search keyword strictly.
-        Returns True if the item is valid, False otherwise.
-        """
-        title = item.get("Title", "").upper()
-        keyword_upper = keyword.upper()
+    def search_url(self, keyword, page=1):
+        return self.filtered(f"https://www.amazon.com/s?k={keyword.replace(' ', '+')}&page={page}")
+
+    def price_filter(self, low, high):
+        # p_36 is the price refinement, in cents
+        return f"&rh=p_36%3A{int(low * 100)}-{'' if high is None else int(high * 100)}"
+
+    def card_key(self, card):
+        # Sponsored and organic copies of a product share the card's data-asin
+        return card.get_attribute("data-asin") or super().card_key(card)
+
+    def prepare_context(self, session):
+        # Force USD currency via cookies (already present in a reused profile)
+        if not session.has_cookie("https://www.amazon.com", "i18n-prefs"):
+            session.context.add_cookies([
+                {'name': 'lc-main', 'value': 'en_US', 'domain': '.amazon.com', 'path': '/'},
+                {'name': 'i18n-prefs', 'value': 'USD', 'domain': '.amazon.com', 'path': '/'}
+            ])
+
+    def load_page(self, keyword, page_num, first):
+        if page_num > 1 or self.session.has_session or self.price_range or self.price_sort:
+            # Warm session or a later page: go straight to the results URL
+            return super().load_page(keyword, page_num, first)
+
+        page = self.page
+        response = page.goto("https://www.amazon.com/?currency=USD", timeout=self.budget_ms(self.goto_timeout))
+        time.sleep(random.uniform(2, 5))
         
-        # Strict DDR generation filtering
-        if "DDR5" in keyword_upper and "DDR4" in title:
+        # ... (search logic)
+        self.logger.info(f"Searching for: {keyword}")
+        search_box = page.locator("input[id='twotabsearchtextbox']")
+        search_box.fill(keyword)
+        time.sleep(random.uniform(1, 2))
+        search_box.press("Enter")
+        time.sleep(random.uniform(3, 6))
+        return wait_and_classify(page, self.results_selector, response, timeout=self.budget_ms(15000))
+
+    def has_next_page(self):
+        self.logger.info("Checking for next page button...")
+        next_button = self.page.locator("a.s-pagination-next")
+        if next_button.count() == 0:
+            self.logger.info("Next button not found. Stopping.")
             return False
-        if "DDR4" in keyword_upper and "DDR5" in title:
+        classes = next_button.get_attribute("class") or ""
+        if "s-pagination-disabled" in classes:
+            self.logger.info("Next button is disabled. Stopping.")
             return False
-            
         return True
 
-    def scrape_search_results(self, keyword, max_pages=1):
+    def extract_cards(self, keyword):
         results = []
-        
-        with sync_playwright() as p:
-            proxy = None
-            if self.use_proxy:
-                proxy = self.proxy_manager.get_random_proxy()
-            
-            browser_args = {}
-            if proxy:
-                self.logger.info(f"Using proxy: {proxy}")
-                browser_args['proxy'] = {"server": proxy}
-            
-            browser = p.chromium.launch(headless=self.headless, args=["--disable-blink-features=AutomationControlled"])
-            
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='en-US'
-            )
-            
-            # Force USD currency via cookies
-            context.add_cookies([
-                {'name': 'lc-main', 'value': 'en_US', 'domain': '.amazon.com', 'path': '/'},
-                {'name': 'i18n-prefs', 'value': 'USD', 'domain': '.amazon.com', 'path': '/'}
-            ])
-            
-            stealth_sync(context)
-            
-            page = context.new_page()
-            
+        product_cards = self.page.locator(self.results_selector).all()
+        self.logger.info(f"Found {len(product_cards)} cards")
+        for card in product_cards:
+            if self.out_of_time():
+                break
             try:
-                self.logger.info("Navigating to Amazon...")
-                # Reduced timeout to 30 seconds to fail fast on bad proxies
-                page.goto("https://www.amazon.com/?currency=USD", timeout=30000)
-                time.sleep(random.uniform(2, 5))
+                if self.is_duplicate(card):
+                    continue
+                # Improved Title Selector (last winning candidate is tried first)
+                title_el = selector_cache.first_match(card, "amazon", "title", ["h2 a span", "h2 a", "h2"])
+                link_el = card.locator("h2 a").first
                 
-                # ... (search logic)
-                self.logger.info(f"Searching for: {keyword}")
-                search_box = page.locator("input[id='twotabsearchtextbox']")
-                search_box.fill(keyword)
-                time.sleep(random.uniform(1, 2))
-                search_box.press("Enter")
-                time.sleep(random.uniform(3, 6))
+                # Price
+                price_el = card.locator(".a-price .a-offscreen").first
+                rating_el = card.locator("span[aria-label*='out of 5 stars']")
+                # Sponsored cards are placed out of price order, even on price-sorted results
+                sponsored = card.locator(".puis-sponsored-label-text, a[href*='/sspa/click'], span:has-text('Sponsored')").count() > 0
                 
-                for current_page in range(1, max_pages + 1):
-                    self.logger.info(f"Scraping page {current_page}...")
-                    
-                    # Wait for results to load
-                    try:
-                        page.wait_for_selector("div[data-component-type='s-search-result']", timeout=15000)
-                    except:
-                        self.logger.warning("Timeout waiting for search results. Maybe no more results or blocked.")
-                        break
-
-                    product_cards = page.locator("div[data-component-type='s-search-result']").all()
-                    self.logger.info(f"Found {len(product_cards)} cards on page {current_page}")
-                    
-                    page_results = 0
-                    for card in product_cards:
-                        try:
-                            # Improved Title Selector
-                            title_el = card.locator("h2 a span")
-                            link_el = card.locator("h2 a").first
-                            
-                            if title_el.count() == 0:
-                                title_el = card.locator("h2 a")
-                            if title_el.count() == 0:
-                                title_el = card.locator("h2")
-                            
-                            # Price
-                            price_el = card.locator(".a-price .a-offscreen").first
-                            rating_el = card.locator("span[aria-label*='out of 5 stars']")
-                            
-                            title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
-                            price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
-                            rating = rating_el.get_attribute("aria-label") if rating_el.count() > 0 else "N/A"
-                            
-                            link = "N/A"
-                            try:
-                                if link_el.count() > 0:
-                                    href = link_el.get_attribute("href")
-                                    if href:
-                                        if href.startswith("http"):
-                                            link = href
-                                        else:
-                                            link = f"https://www.amazon.com{href}"
-                                else:
-                                    # Try finding any link in the card
-                                    any_link = card.locator("a.a-link-normal").first
-                                    if any_link.count() > 0:
-                                        href = any_link.get_attribute("href")
-                                        if href:
-                                            if href.startswith("http"):
-                                                link = href
-                                            else:
-                                                link = f"https://www.amazon.com{href}"
-                            except Exception:
-                                pass
-                            
-                            # Parse detailed specs
-                            specs = self.parse_specs(title)
-                            
-                            item = {
-                                **specs,
-                                "Title": title,
-                                "Price": price,
-                                "Rating": rating,
-                                "Product Link": link
-                            }
-                            
-                            # Validate Item
-                            if self.validate_item(item, keyword):
-                                results.append(item)
-                                page_results += 1
-                            else:
-                                # self.logger.info(f"Filtered out irrelevant item: {title}")
-                                pass
-
-                        except Exception as e:
-                            continue
-                    
-                    self.logger.info(f"Added {page_results} valid items from page {current_page}. Total: {len(results)}")
-
-                    if current_page < max_pages:
-                        self.logger.info("Checking for next page button...")
-                        next_button = page.locator("a.s-pagination-next")
-                        
-                        if next_button.count() > 0:
-                            classes = next_button.get_attribute("class") or ""
-                            if "s-pagination-disabled" not in classes:
-                                self.logger.info("Clicking next page...")
-                                
-                                # Get current URL to verify navigation later
-                                old_url = page.url
-                                
-                                next_button.click()
-                                
-                                # Robust wait for navigation
-                                try:
-                                    page.wait_for_load_state("domcontentloaded", timeout=15000)
-                                    # Wait for URL to change or a short sleep if URL parameters change
-                                    time.sleep(random.uniform(4, 8))
-                                    
-                                    # Check if we actually moved
-                                    if page.url == old_url:
-                                        self.logger.warning("URL did not change after clicking next. Retrying or stopping.")
-                                        # Optional: Try clicking again or break
-                                        break
-                                        
-                                except Exception as e:
-                                    self.logger.warning(f"Error waiting for next page: {e}")
-                                    break
-                            else:
-                                self.logger.info("Next button is disabled. Stopping.")
-                                break
-                        else:
-                            self.logger.info("Next button not found. Stopping.")
-                            break
-                            
-            except Exception as e:
-                self.logger.error(f"An error occurred: {e}")
+                title = title_el.inner_text().strip() if title_el is not None else "N/A"
+                price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
+                rating = rating_el.get_attribute("aria-label") if rating_el.count() > 0 else "N/A"
+                
+                link = "N/A"
                 try:
-                    page.screenshot(path="error_screenshot.png")
-                    self.logger.info("Screenshot saved to error_screenshot.png")
-                except:
+                    if link_el.count() > 0:
+                        href = link_el.get_attribute("href")
+                        if href:
+                            if href.startswith("http"):
+                                link = href
+                            else:
+                                link = f"https://www.amazon.com{href}"
+                    else:
+                        # Try finding any link in the card
+                        any_link = card.locator("a.a-link-normal").first
+                        if any_link.count() > 0:
+                            href = any_link.get_attribute("href")
+                            if href:
+                                if href.startswith("http"):
+                                    link = href
+                                else:
+                                    link = f"https://www.amazon.com{href}"
+                except Exception:
                     pass
-            finally:
-                browser.close()
                 
+                # Parse detailed specs
+                specs = self.parse_specs(title)
+                
+                item = {
+                    **specs,
+                    "Title": title,
+                    "Price": price,
+                    "Rating": rating,
+                    "Product Link": link
+                }
+                
+                # Validate Item
+                if self.validate_item(item, keyword):
+                    results.append(item)
+                    self.mark_seen()
+                    if sponsored:
+                        self.mark_ad(item)
+                else:
+                    # self.logger.info(f"Filtered out irrelevant item: {title}")
+                    pass
+
+            except Exception as e:
+                self.card_failed(e)
         return results
 
-class NeweggScraper:
-    def __init__(self, headless=True, use_proxy=True):
-        self.headless = headless
-        self.use_proxy = use_proxy
-        self.proxy_manager = ProxyManager()
-        self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
+class NeweggScraper(BaseScraper):
+    site = "newegg"
+    name = "Newegg"
+    results_selector = "div.item-cell"
+    locale = 'en-US'
+    ssr_capable = True
+    error_screenshot = True
+    price_sort_param = "&Order=1"
+    api_pattern = re.compile(r"newegg\.com/.*(?:api/.*search|SearchV\d|ProductList)", re.IGNORECASE)
+    lazy_loads = True
 
     def parse_specs(self, title):
         specs = {
@@ -359,148 +931,105 @@ class NeweggScraper:
             
         return specs
 
-    def validate_item(self, item, keyword):
-        """
-        Validates if the item matches the search keyword strictly.
-        Returns True if the item is valid, False otherwise.
-        """
-        title = item.get("Title", "").upper()
-        keyword_upper = keyword.upper()
-        
-        # Strict DDR generation filtering
-        if "DDR5" in keyword_upper and "DDR4" in title:
-            return False
-        if "DDR4" in keyword_upper and "DDR5" in title:
-            return False
-            
-        return True
+    def search_url(self, keyword, page=1):
+        # Newegg search URL structure
+        url = f"https://www.newegg.com/p/pl?d={keyword.replace(' ', '+')}"
+        if page > 1:
+            url += f"&page={page}"
+        return self.filtered(url)
 
-    def scrape_search_results(self, keyword, max_pages=1):
+    def price_filter(self, low, high):
+        return f"&LeftPriceRange={low}+{'' if high is None else high}"
+
+    def has_next_page(self):
+        # Pagination logic for Newegg
+        next_button = selector_cache.first_match(self.page, "newegg", "next", ["button[title='Next']", "a[title='Next']"])
+        if next_button is not None and next_button.is_enabled():
+            return True
+        self.logger.info("Next button not found or disabled. Stopping.")
+        return False
+
+    def api_record(self, record):
+        cell = record.get("ItemCell")
+        if not isinstance(cell, dict):
+            return None
+        title = (cell.get("Description") or {}).get("Title")
+        item_number = cell.get("NeweggItemNumber") or cell.get("Item")
+        if not title or not item_number:
+            return None
+        price = cell.get("FinalPrice") or cell.get("UnitCost")
+        rating = (cell.get("Review") or {}).get("Rating")
+        return (
+            title.strip(),
+            format_usd(price) if price else "N/A",
+            f"Rating + {rating}" if rating else "N/A",
+            f"https://www.newegg.com/p/{item_number}",
+        )
+
+    def extract_cards(self, keyword):
+        page = self.page
         results = []
-        
-        with sync_playwright() as p:
-            proxy = None
-            if self.use_proxy:
-                proxy = self.proxy_manager.get_random_proxy()
-            
-            browser_args = {}
-            if proxy:
-                self.logger.info(f"Using proxy: {proxy}")
-                browser_args['proxy'] = {"server": proxy}
-            
-            browser = p.chromium.launch(headless=self.headless, args=["--disable-blink-features=AutomationControlled"])
-            
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='en-US'
-            )
-            
-            stealth_sync(context)
-            
-            page = context.new_page()
-            
+        # Scroll down to load lazy images/content
+        self.wait_for_lazy_load()
+
+        product_cards = page.locator(self.results_selector).all()
+        self.logger.info(f"Found {len(product_cards)} cards")
+        for card in product_cards:
+            if self.out_of_time():
+                break
             try:
-                self.logger.info("Navigating to Newegg...")
-                # Newegg search URL structure
-                search_url = f"https://www.newegg.com/p/pl?d={keyword.replace(' ', '+')}"
-                page.goto(search_url, timeout=60000)
-                time.sleep(random.uniform(2, 5))
+                if self.is_duplicate(card):
+                    continue
+                # Selectors based on inspection
+                title_el = card.locator("a.item-title")
+                price_strong_el = card.locator("li.price-current strong")
+                price_sup_el = card.locator("li.price-current sup")
+                rating_el = card.locator("a.item-rating")
                 
-                for current_page in range(1, max_pages + 1):
-                    self.logger.info(f"Scraping page {current_page}...")
-                    
-                    # Wait for results
-                    try:
-                        page.wait_for_selector("div.item-cell", timeout=15000)
-                    except:
-                        self.logger.warning("Timeout waiting for search results.")
-                        break
-
-                    # Scroll down to load lazy images/content
-                    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    time.sleep(2)
-
-                    product_cards = page.locator("div.item-cell").all()
-                    self.logger.info(f"Found {len(product_cards)} cards on page {current_page}")
-                    
-                    page_results = 0
-                    for card in product_cards:
-                        try:
-                            # Selectors based on inspection
-                            title_el = card.locator("a.item-title")
-                            price_strong_el = card.locator("li.price-current strong")
-                            price_sup_el = card.locator("li.price-current sup")
-                            rating_el = card.locator("a.item-rating")
-                            
-                            title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
-                            
-                            price = "N/A"
-                            if price_strong_el.count() > 0 and price_sup_el.count() > 0:
-                                price = f"${price_strong_el.inner_text().strip()}{price_sup_el.inner_text().strip()}"
-                            
-                            rating = rating_el.get_attribute("title") if rating_el.count() > 0 else "N/A"
-                            
-                            link = "N/A"
-                            if title_el.count() > 0:
-                                href = title_el.get_attribute("href")
-                                if href:
-                                    link = href
-                            
-                            # Parse specs
-                            specs = self.parse_specs(title)
-                            
-                            item = {
-                                **specs,
-                                "Title": title,
-                                "Price": price,
-                                "Rating": rating,
-                                "Product Link": link
-                            }
-                            
-                            # Validate Item
-                            if self.validate_item(item, keyword):
-                                results.append(item)
-                                page_results += 1
-                            else:
-                                pass
+                title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
+                
+                price = "N/A"
+                if price_strong_el.count() > 0 and price_sup_el.count() > 0:
+                    price = f"${price_strong_el.inner_text().strip()}{price_sup_el.inner_text().strip()}"
+                
+                rating = rating_el.get_attribute("title") if rating_el.count() > 0 else "N/A"
+                
+                link = "N/A"
+                if title_el.count() > 0:
+                    href = title_el.get_attribute("href")
+                    if href:
+                        link = href
+                
+                # Parse specs
+                specs = self.parse_specs(title)
+                
+                item = {
+                    **specs,
+                    "Title": title,
+                    "Price": price,
+                    "Rating": rating,
+                    "Product Link": link
+                }
+                
+                # Validate Item
+                if self.validate_item(item, keyword):
+                    results.append(item)
+                    self.mark_seen()
+                else:
+                    pass
 
-                        except Exception as e:
-                            continue
-                    
-                    self.logger.info(f"Added {page_results} items from page {current_page}. Total: {len(results)}")
-
-                    if current_page < max_pages:
-                        # Pagination logic for Newegg
-                        next_button = page.locator("button[title='Next']") # Check this selector if needed, usually it's a button or link
-                        if next_button.count() == 0:
-                             next_button = page.locator("a[title='Next']")
-
-                        if next_button.count() > 0 and next_button.is_enabled():
-                            self.logger.info("Clicking next page...")
-                            next_button.click()
-                            time.sleep(random.uniform(3, 6))
-                        else:
-                            self.logger.info("Next button not found or disabled. Stopping.")
-                            break
-                            
             except Exception as e:
-                self.logger.error(f"An error occurred: {e}")
-                try:
-                    page.screenshot(path="newegg_error_screenshot.png")
-                except:
-                    pass
-            finally:
-                browser.close()
-                
+                self.card_failed(e)
         return results
 
-class BestBuyScraper:
-    def __init__(self, headless=True, use_proxy=True):
-        self.headless = headless
-        self.use_proxy = use_proxy
-        self.proxy_manager = ProxyManager()
-        self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
+class BestBuyScraper(BaseScraper):
+    site = "bestbuy"
+    name = "Best Buy"
+    results_selector = "li.sku-item"
+    page_delay = (5, 5)
+    price_sort_param = "&sp=%2Bcurrentprice%20skuidsaas"
+    # Search results only: priceBlocks and recommendation payloads also carry sku + name
+    api_pattern = re.compile(r"bestbuy\.com/(?:site/searchpage\.jsp|api/[^?]*search)", re.IGNORECASE)
 
     def parse_specs(self, title):
         specs = {
@@ -535,76 +1064,77 @@ class BestBuyScraper:
         
         return specs
 
-    def validate_item(self, item, keyword):
-        title = item.get("Title", "").upper()
-        keyword_upper = keyword.upper()
-        if "DDR5" in keyword_upper and "DDR4" in title: return False
-        if "DDR4" in keyword_upper and "DDR5" in title: return False
-        return True
+    def search_url(self, keyword, page=1):
+        url = f"https://www.bestbuy.com/site/searchpage.jsp?st={keyword.replace(' ', '+')}"
+        if page > 1:
+            url += f"&cp={page}"
+        return self.filtered(url)
+
+    def price_filter(self, low, high):
+        upper = f"%20to%20%24{high}" if high is not None else "%20and%20Up"
+        return f"&qp=currentprice_facet%3DPrice~%24{low}{upper}"
 
-    def scrape_search_results(self, keyword, max_pages=1):
+    def card_key(self, card):
+        return card.get_attribute("data-sku-id") or super().card_key(card)
+
+    def has_next_page(self):
+        next_btn = self.page.locator("a.sku-list-page-next")
+        return next_btn.count() > 0 and "disabled" not in (next_btn.get_attribute("class") or "")
+
+    def api_record(self, record):
+        sku = record.get("skuId") or record.get("sku")
+        name = record.get("name")
+        if isinstance(name, dict):
+            name = name.get("short")
+        if not sku or not isinstance(name, str):
+            return None
+        price = record.get("customerPrice") or record.get("currentPrice") or record.get("salePrice") or record.get("price")
+        if isinstance(price, dict):
+            price = price.get("currentPrice") or price.get("customerPrice")
+        return (
+            name.strip(),
+            format_usd(price) if price else "N/A",
+            "N/A",
+            f"https://www.bestbuy.com/site/{sku}.p?skuId={sku}",
+        )
+
+    def extract_cards(self, keyword):
+        page = self.page
         results = []
-        with sync_playwright() as p:
-            proxy = None
-            if self.use_proxy: proxy = self.proxy_manager.get_random_proxy()
-            
-            browser_args = {}
-            if proxy: browser_args['proxy'] = {"server": proxy}
-            
-            browser = p.chromium.launch(headless=self.headless, args=["--disable-blink-features=AutomationControlled"])
-            context = browser.new_context(user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            stealth_sync(context)
-            page = context.new_page()
-            
+        product_cards = page.locator(self.results_selector).all()
+        self.logger.info(f"Found {len(product_cards)} cards")
+        
+        for card in product_cards:
+            if self.out_of_time():
+                break
             try:
-                self.logger.info("Navigating to Best Buy...")
-                page.goto(f"https://www.bestbuy.com/site/searchpage.jsp?st={keyword.replace(' ', '+')}", timeout=60000)
+                if self.is_duplicate(card):
+                    continue
+                title_el = card.locator("h4.sku-header a")
+                price_el = card.locator("div.priceView-hero-price span[aria-hidden='true']").first
                 
-                for current_page in range(1, max_pages + 1):
-                    try:
-                        page.wait_for_selector("li.sku-item", timeout=15000)
-                    except:
-                        self.logger.warning("Timeout waiting for Best Buy results.")
-                        break
-                        
-                    product_cards = page.locator("li.sku-item").all()
-                    self.logger.info(f"Found {len(product_cards)} cards on page {current_page}")
-                    
-                    for card in product_cards:
-                        try:
-                            title_el = card.locator("h4.sku-header a")
-                            price_el = card.locator("div.priceView-hero-price span[aria-hidden='true']").first
-                            
-                            title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
-                            price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
-                            link = f"https://www.bestbuy.com{title_el.get_attribute('href')}" if title_el.count() > 0 else "N/A"
-                            
-                            specs = self.parse_specs(title)
-                            item = {**specs, "Title": title, "Price": price, "Rating": "N/A", "Product Link": link}
-                            
-                            if self.validate_item(item, keyword):
-                                results.append(item)
-                        except: continue
-                        
-                    if current_page < max_pages:
-                        next_btn = page.locator("a.sku-list-page-next")
-                        if next_btn.count() > 0 and "disabled" not in next_btn.get_attribute("class"):
-                            next_btn.click()
-                            time.sleep(5)
-                        else: break
+                title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
+                price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
+                link = f"https://www.bestbuy.com{title_el.get_attribute('href')}" if title_el.count() > 0 else "N/A"
+                
+                specs = self.parse_specs(title)
+                item = {**specs, "Title": title, "Price": price, "Rating": "N/A", "Product Link": link}
+                
+                if self.validate_item(item, keyword):
+                    results.append(item)
+                    self.mark_seen()
             except Exception as e:
-                self.logger.error(f"Best Buy Error: {e}")
-            finally:
-                browser.close()
+                self.card_failed(e)
         return results
 
-class BHScraper:
-    def __init__(self, headless=True, use_proxy=True):
-        self.headless = headless
-        self.use_proxy = use_proxy
-        self.proxy_manager = ProxyManager()
-        self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
+class BHScraper(BaseScraper):
+    site = "bh"
+    name = "B&H"
+    card_candidates = ["div[data-selenium='miniProductPage']", "div[class*='product_']"]
+    # Race data-selenium against the observed class fallback (and bot walls) instead of waiting them out in turn
+    results_selector = ", ".join(card_candidates)
+    page_delay = (5, 5)
+    ssr_capable = True
 
     def parse_specs(self, title):
         specs = {
@@ -629,93 +1159,63 @@ class BHScraper:
         if speed_match: specs["Speed"] = speed_match.group(0)
         return specs
 
-    def validate_item(self, item, keyword):
-        title = item.get("Title", "").upper()
-        keyword_upper = keyword.upper()
-        if "DDR5" in keyword_upper and "DDR4" in title: return False
-        if "DDR4" in keyword_upper and "DDR5" in title: return False
-        return True
+    def search_url(self, keyword, page=1):
+        url = f"https://www.bhphotovideo.com/c/search?Ntt={keyword.replace(' ', '+')}"
+        if page > 1:
+            url += f"&pn={page}"
+        return url
+
+    def has_next_page(self):
+        return self.page.locator("a[data-selenium='listingPagingNextLink']").count() > 0
 
-    def scrape_search_results(self, keyword, max_pages=1):
+    def extract_cards(self, keyword):
+        page = self.page
         results = []
-        with sync_playwright() as p:
-            proxy = None
-            if self.use_proxy: proxy = self.proxy_manager.get_random_proxy()
-            
-            browser_args = {}
-            if proxy: browser_args['proxy'] = {"server": proxy}
-            
-            browser = p.chromium.launch(headless=self.headless, args=["--disable-blink-features=AutomationControlled"])
-            context = browser.new_context(user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            stealth_sync(context)
-            page = context.new_page()
-            
+        card_selector = selector_cache.wait_for_any(page, "bh", "card", self.card_candidates, timeout=1000)
+        if card_selector is None:
+            self.logger.warning("Timeout waiting for B&H results.")
+            return results
+        product_cards = page.locator(card_selector).all()
+        self.logger.info(f"Found {len(product_cards)} cards")
+        
+        for card in product_cards:
+            if self.out_of_time():
+                break
             try:
-                self.logger.info("Navigating to B&H...")
-                page.goto(f"https://www.bhphotovideo.com/c/search?Ntt={keyword.replace(' ', '+')}", timeout=60000)
-                
-                for current_page in range(1, max_pages + 1):
-                    try:
-                        page.wait_for_selector("div[data-selenium='miniProductPage']", timeout=15000)
-                    except:
-                        # Fallback to observed class if data-selenium fails
-                        try:
-                            page.wait_for_selector("div[class*='product_']", timeout=5000)
-                        except:
-                            self.logger.warning("Timeout waiting for B&H results.")
-                            break
-                        
-                    product_cards = page.locator("div[data-selenium='miniProductPage']").all()
-                    if not product_cards:
-                         # Fallback selector
-                         product_cards = page.locator("div[class*='product_']").all() # Generic fallback
+                if self.is_duplicate(card):
+                    continue
+                title_el = selector_cache.first_match(card, "bh", "title", ["span[data-selenium='miniProductPageProductName']", "a[class*='title_']"])
 
-                    self.logger.info(f"Found {len(product_cards)} cards on page {current_page}")
+                price_el = card.locator("span[data-selenium='uppedDecimalPrice']")
+                
+                title = title_el.inner_text().strip() if title_el is not None else "N/A"
+                price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
+                
+                link_el = selector_cache.first_match(card, "bh", "link", ["a[data-selenium='miniProductPageProductNameLink']", "a[class*='title_']"])
                     
-                    for card in product_cards:
-                        try:
-                            # Try data-selenium first
-                            title_el = card.locator("span[data-selenium='miniProductPageProductName']")
-                            if title_el.count() == 0:
-                                title_el = card.locator("a[class*='title_']") # Fallback
-
-                            price_el = card.locator("span[data-selenium='uppedDecimalPrice']")
-                            
-                            title = title_el.inner_text().strip() if title_el.count() > 0 else "N/A"
-                            price = price_el.inner_text().strip() if price_el.count() > 0 else "N/A"
-                            
-                            link_el = card.locator("a[data-selenium='miniProductPageProductNameLink']")
-                            if link_el.count() == 0:
-                                link_el = card.locator("a[class*='title_']")
-                                
-                            link = f"https://www.bhphotovideo.com{link_el.get_attribute('href')}" if link_el.count() > 0 else "N/A"
-                            
-                            specs = self.parse_specs(title)
-                            item = {**specs, "Title": title, "Price": price, "Rating": "N/A", "Product Link": link}
-                            
-                            if self.validate_item(item, keyword):
-                                results.append(item)
-                        except: continue
-                        
-                    if current_page < max_pages:
-                        next_btn = page.locator("a[data-selenium='listingPagingNextLink']")
-                        if next_btn.count() > 0:
-                            next_btn.click()
-                            time.sleep(5)
-                        else: break
+                link = f"https://www.bhphotovideo.com{link_el.get_attribute('href')}" if link_el is not None else "N/A"
+                
+                specs = self.parse_specs(title)
+                item = {**specs, "Title": title, "Price": price, "Rating": "N/A", "Product Link": link}
+                
+                if self.validate_item(item, keyword):
+                    results.append(item)
+                    self.mark_seen()
             except Exception as e:
-                self.logger.error(f"B&H Error: {e}")
-            finally:
-                browser.close()
+                self.card_failed(e)
         return results
 
-class PCHomeScraper:
-    def __init__(self, headless=True, use_proxy=True):
-        self.headless = headless
-        self.use_proxy = use_proxy
-        self.proxy_manager = ProxyManager()
-        self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
+class PCHomeScraper(BaseScraper):
+    site = "pchome"
+    name = "PCHome"
+    results_selector = "div.c-prodInfoV2--gridCard"
+    page_delay = (3, 3)
+    price_sort_param = "&sort=prc/ac"
+    api_pattern = re.compile(r"pchome\.com\.tw/search/v\d", re.IGNORECASE)
+    lazy_loads = True
+
+    def __init__(self, headless=True, use_proxy=False, browser=None):
+        super().__init__(headless=headless, use_proxy=use_proxy, browser=browser)
         self.exchange_rate = 32.5 # 1 USD = 32.5 TWD
 
     def parse_specs(self, title):
@@ -750,13 +1250,6 @@ class PCHomeScraper:
         
         return specs
 
-    def validate_item(self, item, keyword):
-        title = item.get("Title", "").upper()
-        keyword_upper = keyword.upper()
-        if "DDR5" in keyword_upper and "DDR4" in title: return False
-        if "DDR4" in keyword_upper and "DDR5" in title: return False
-        return True
-
     def convert_price(self, price_str):
         try:
             # Remove non-numeric characters except dot
@@ -767,100 +1260,122 @@ class PCHomeScraper:
         except:
             return "N/A"
 
-    def scrape_search_results(self, keyword, max_pages=1):
+    def search_url(self, keyword, page=1):
+        url = f"https://24h.pchome.com.tw/search/?q={keyword.replace(' ', '%20')}"
+        if page > 1:
+            # PCHome search usually has pages. URL parameter &page=2
+            url += f"&page={page}"
+        return self.filtered(url)
+
+    def price_filter(self, low, high):
+        # Bounds are in TWD
+        upper = "" if high is None else int(high * self.exchange_rate)
+        return f"&price={int(low * self.exchange_rate)}-{upper}"
+
+    def api_record(self, record):
+        prod_id = record.get("Id")
+        name = record.get("Name") or record.get("name")
+        if not prod_id or not isinstance(name, str):
+            return None
+        price = record.get("Price") if record.get("Price") is not None else record.get("price")
+        return (
+            name.strip(),
+            self.convert_price(str(price)) if price is not None else "N/A",
+            "N/A",
+            f"https://24h.pchome.com.tw/prod/{prod_id}",
+        )
+
+    def extract_cards(self, keyword):
+        page = self.page
         results = []
-        with sync_playwright() as p:
-            proxy = None
-            if self.use_proxy: proxy = self.proxy_manager.get_random_proxy()
-            
-            browser_args = {}
-            if proxy: browser_args['proxy'] = {"server": proxy}
-            
-            browser = p.chromium.launch(headless=self.headless, args=["--disable-blink-features=AutomationControlled"])
-            context = browser.new_context(user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            stealth_sync(context)
-            page = context.new_page()
+        # Scroll to load more items (PCHome often uses infinite scroll or lazy load)
+        self.wait_for_lazy_load()
             
+        product_cards = page.locator(self.results_selector).all()
+        self.logger.info(f"Found {len(product_cards)} cards")
+        
+        for card in product_cards:
+            if self.out_of_time():
+                break
             try:
-                self.logger.info("Navigating to PCHome...")
-                page.goto(f"https://24h.pchome.com.tw/search/?q={keyword.replace(' ', '%20')}", timeout=60000)
+                if self.is_duplicate(card):
+                    continue
+                # Selectors based on inspection
+                # Title is often in a specific div structure or has a class like c-prodInfoV2__title if available
+                # Based on inspection: "div with no specific class... one after the div with text..."
+                # Let's try to find the title by text content or structure
                 
-                for current_page in range(1, max_pages + 1):
-                    try:
-                        page.wait_for_selector("div.c-prodInfoV2--gridCard", timeout=15000)
-                    except:
-                        self.logger.warning("Timeout waiting for PCHome results.")
-                        break
-                        
-                    # Scroll to load more items (PCHome often uses infinite scroll or lazy load)
-                    for _ in range(5):
-                        page.evaluate("window.scrollBy(0, 1000)")
-                        time.sleep(1)
-                        
-                    product_cards = page.locator("div.c-prodInfoV2--gridCard").all()
-                    self.logger.info(f"Found {len(product_cards)} cards on page {current_page}")
+                # Try finding the link first, it usually wraps the title or is near it
+                link_el = card.locator("a.c-prodInfoV2__link").first
+                
+                title = "N/A"
+                link = "N/A"
+                
+                if link_el.count() > 0:
+                    link = link_el.get_attribute("href")
+                    if link and not link.startswith("http"):
+                        link = f"https://24h.pchome.com.tw{link}"
                     
-                    for card in product_cards:
-                        try:
-                            # Selectors based on inspection
-                            # Title is often in a specific div structure or has a class like c-prodInfoV2__title if available
-                            # Based on inspection: "div with no specific class... one after the div with text..."
-                            # Let's try to find the title by text content or structure
-                            
-                            # Try finding the link first, it usually wraps the title or is near it
-                            link_el = card.locator("a.c-prodInfoV2__link").first
-                            
-                            title = "N/A"
-                            link = "N/A"
-                            
-                            if link_el.count() > 0:
-                                link = link_el.get_attribute("href")
-                                if link and not link.startswith("http"):
-                                    link = f"https://24h.pchome.com.tw{link}"
-                                
-                                # Title is often inside the link or a sibling div
-                                # Inspection said: a.c-prodInfoV2__link > div > div > div > div > div:nth-child(2)
-                                # Let's try getting all text from the link and splitting/cleaning
-                                all_text = link_el.inner_text()
-                                lines = [line.strip() for line in all_text.split('\n') if line.strip()]
-                                # Heuristic: The longest line is likely the title, or the one with the keyword
-                                for line in lines:
-                                    if len(line) > 10: # Titles are usually long
-                                        title = line
-                                        break
-                            
-                            # Price
-                            # Inspection: div.c-prodInfoV2--gridCard div[style*='align-items: flex-end'] > div > div
-                            # Or look for '$' sign
-                            price_el = card.locator("div").filter(has_text="$").last
-                            price_text = price_el.inner_text() if price_el.count() > 0 else "N/A"
-                            
-                            # Extract just the price number
-                            price_match = re.search(r'\$([\d,]+)', price_text)
-                            if price_match:
-                                price_twd = price_match.group(1)
-                                price = self.convert_price(price_twd)
-                            else:
-                                price = "N/A"
-                            
-                            specs = self.parse_specs(title)
-                            item = {"Title": title, "Price": price, "Rating": "N/A", **specs, "Product Link": link}
-                            
-                            if self.validate_item(item, keyword):
-                                results.append(item)
-                        except: continue
-                        
-                    # PCHome pagination is often infinite scroll or "Next" button. 
-                    # For V1, we might just stick to the first loaded batch or try to find a next button if it exists.
-                    # PCHome search usually has pages. URL parameter &page=2
-                    if current_page < max_pages:
-                        # Construct next page URL
-                        next_page_url = f"https://24h.pchome.com.tw/search/?q={keyword.replace(' ', '%20')}&page={current_page + 1}"
-                        page.goto(next_page_url)
-                        time.sleep(3)
-                        
+                    # Title is often inside the link or a sibling div
+                    # Inspection said: a.c-prodInfoV2__link > div > div > div > div > div:nth-child(2)
+                    # Let's try getting all text from the link and splitting/cleaning
+                    all_text = link_el.inner_text()
+                    lines = [line.strip() for line in all_text.split('\n') if line.strip()]
+                    # Heuristic: The longest line is likely the title, or the one with the keyword
+                    for line in lines:
+                        if len(line) > 10: # Titles are usually long
+                            title = line
+                            break
+                
+                # Price
+                # Inspection: div.c-prodInfoV2--gridCard div[style*='align-items: flex-end'] > div > div
+                # Or look for '$' sign
+                price_el = card.locator("div").filter(has_text="$").last
+                price_text = price_el.inner_text() if price_el.count() > 0 else "N/A"
+                
+                # Extract just the price number
+                price_match = re.search(r'\$([\d,]+)', price_text)
+                if price_match:
+                    price_twd = price_match.group(1)
+                    price = self.convert_price(price_twd)
+                else:
+                    price = "N/A"
+                
+                specs = self.parse_specs(title)
+                item = {"Title": title, "Price": price, "Rating": "N/A", **specs, "Product Link": link}
+                
+                if self.validate_item(item, keyword):
+                    results.append(item)
+                    self.mark_seen()
             except Exception as e:
-                self.logger.error(f"PCHome Error: {e}")
-            finally:
-                browser.close()
+                self.card_failed(e)
         return results
+
+SCRAPERS = {
+    "amazon": AmazonScraper,
+    "newegg": NeweggScraper,
+    "bestbuy": BestBuyScraper,
+    "bh": BHScraper,
+    "pchome": PCHomeScraper,
+}
+
+SOURCE_LABELS = {
+    "bh": "B&H",
+    "pchome": "PCHome",
+}
+
+def enable_ssr(sites="all"):
+    """Turns on JavaScript-disabled loading for a comma-separated site list, or every SSR-capable site."""
+    if sites == "all":
+        SSR_SITES.update(key for key, cls in SCRAPERS.items() if cls.ssr_capable)
+    else:
+        SSR_SITES.update(site.strip() for site in sites.split(",") if site.strip() in SCRAPERS)
+    return SSR_SITES
+
+def get_scraper(source, headless=True, use_proxy=False, browser=None):
+    """Returns a scraper instance for a source key such as 'amazon' or 'bh'."""
+    return SCRAPERS[source](headless=headless, use_proxy=use_proxy, browser=browser)
+
+def source_label(source):
+    """Display name written to the 'Source' column."""
+    return SOURCE_LABELS.get(source, source.capitalize())
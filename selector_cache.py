@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_CACHE_FILE = "selector_cache.json"
+
+
+class SelectorCache:
+    """
+    Per-site registry of CSS selector candidates that remembers which one
+    matched last, persisted to a JSON file between runs.
+
+    Live selectors are tried in their declared priority order; the candidate
+    lists run from specific to broad, so a broad fallback that matched once
+    must not take precedence over a specific selector. A selector that was
+    tried and missed `max_misses` times in a row, or has not matched for
+    `ttl_days`, is considered dead and moves to the back of the list, so a
+    layout change costs a few misses instead of a wasted lookup on every
+    card. A dead selector that has not been tried for `ttl_days` gets its
+    priority back once, in case the layout changed back.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_days=7, max_misses=5):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_misses = max_misses
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable selector cache {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def _stats(self, site, key):
+        return self.entries.setdefault(site, {}).setdefault(key, {})
+
+    def is_dead(self, stats, now=None):
+        now = now or time.time()
+        if not stats:
+            return False
+        if stats.get("misses", 0) >= self.max_misses:
+            return now - (stats.get("last_miss") or 0) <= self.ttl
+        if stats.get("last_hit"):
+            return now - stats["last_hit"] > self.ttl
+        return False
+
+    def ordered(self, site, key, candidates):
+        """Returns the live candidates in declared priority order, followed by the dead ones."""
+        now = time.time()
+        with self.lock:
+            known = self._stats(site, key)
+            live = [selector for selector in candidates if not self.is_dead(known.get(selector, {}), now)]
+            return live + [selector for selector in candidates if selector not in live]
+
+    def record(self, site, key, winner, tried):
+        """Marks `winner` as a hit and the other `tried` candidates, which lost to it, as misses (winner may be None)."""
+        now = time.time()
+        with self.lock:
+            known = self._stats(site, key)
+            for selector in tried:
+                stats = known.setdefault(selector, {"hits": 0, "misses": 0, "last_hit": None})
+                if selector == winner:
+                    stats["hits"] += 1
+                    stats["misses"] = 0
+                    stats["last_hit"] = now
+                else:
+                    stats["misses"] += 1
+                    stats["last_miss"] = now
+            self.dirty = True
+
+    def wait_for_any(self, page, site, key, candidates, timeout=15000):
+        """
+        Races all candidates with a single wait (a CSS selector list matches
+        whichever renders first), then returns the selector that won, or None
+        on timeout.
+        """
+        ordered = self.ordered(site, key, candidates)
+        try:
+            page.wait_for_selector(", ".join(ordered), timeout=timeout)
+        except Exception:
+            self.record(site, key, None, ordered)
+            return None
+
+        for index, selector in enumerate(ordered):
+            if page.locator(selector).count() > 0:
+                self.record(site, key, selector, ordered[:index + 1])
+                return selector
+        return None
+
+    def first_match(self, root, site, key, candidates):
+        """Returns a locator for the first candidate present under `root` (page or card), or None."""
+        ordered = self.ordered(site, key, candidates)
+        for index, selector in enumerate(ordered):
+            locator = root.locator(selector)
+            if locator.count() > 0:
+                self.record(site, key, selector, ordered[:index + 1])
+                return locator
+        self.record(site, key, None, ordered)
+        return None
+
+
+selector_cache = SelectorCache()
@@ -0,0 +1,173 @@
+import logging
+import queue
+import threading
+import time
+
+from block_detector import SourceBlocked
+from diff import item_key
+from records import ResultSet
+from scheduler import WarmBrowser
+from scraper import get_scraper, source_label
+
+# Initial price boundaries in USD; the last shard is open-ended
+DEFAULT_PRICE_BOUNDS = [0, 50, 100, 150, 250, 500]
+
+# Shards narrower than this are not split further
+MIN_SHARD_WIDTH = 2
+
+
+def plan_shards(bounds=DEFAULT_PRICE_BOUNDS):
+    """[0, 50, 100] -> [(0, 50), (50, 100), (100, None)]"""
+    bounds = sorted(set(bounds))
+    return [(low, high) for low, high in zip(bounds, bounds[1:] + [None])]
+
+
+def split_shard(low, high):
+    """Halves a price range, or returns None if it is too narrow. An open-ended range splits at twice its lower bound."""
+    if high is None:
+        middle = max(low * 2, low + 100)
+        return [(low, middle), (middle, None)]
+    if high - low < MIN_SHARD_WIDTH:
+        return None
+    middle = int(low + (high - low) / 2)
+    return [(low, middle), (middle, high)]
+
+
+def format_range(low, high):
+    return f"${low}-{'' if high is None else f'${high}'}"
+
+
+class ShardedCrawl:
+    """
+    Query planner for deep searches. Pagination is capped on these sites,
+    so one keyword is split into price-range shards using each site's URL
+    price filter, and the shards are crawled in parallel on warm browsers.
+    A shard that still has results on its last allowed page is split in
+    half and both halves are crawled. Items from all shards are merged and
+    deduplicated on their canonical product key. Sites without a usable
+    price filter are crawled once, unsharded.
+    """
+
+    def __init__(self, keyword, sources, pages=3, bounds=DEFAULT_PRICE_BOUNDS, workers=4, per_site=2,
+                 max_shards=64, headless=True, use_proxy=False, deadline=None):
+        self.keyword = keyword
+        self.sources = sources
+        self.pages = pages
+        self.bounds = bounds
+        self.workers = workers
+        self.max_shards = max_shards
+        self.headless = headless
+        self.use_proxy = use_proxy
+        self.deadline = deadline
+        self.site_slots = {source: threading.Semaphore(per_site) for source in sources}
+        # Source labels with failed, blocked, budget-cut or unsplittable shards
+        self.partial_sources = set()
+        self.logger = logging.getLogger(__name__)
+
+    def initial_shards(self):
+        shards = []
+        for source in self.sources:
+            probe = get_scraper(source, headless=self.headless, use_proxy=False)
+            if probe.price_filter(0, 1) is None:
+                self.logger.info(f"{probe.name} has no price filter; crawling it unsharded")
+                shards.append((source, None))
+            else:
+                shards.extend((source, price_range) for price_range in plan_shards(self.bounds))
+        return shards
+
+    def crawl_shard(self, warm, source, price_range):
+        """Runs one shard. Returns (items, hit_page_cap, complete)."""
+        with self.site_slots[source]:
+            scraper = get_scraper(source, headless=self.headless, use_proxy=self.use_proxy, browser=warm.get())
+            scraper.price_range = price_range
+            items = scraper.scrape_search_results(self.keyword, max_pages=self.pages, deadline=self.deadline)
+        stats = scraper.stats
+        # "exhausted" is also set when the last allowed page has no next page, so an exact fit is not split
+        hit_cap = stats["pages"] >= self.pages and not stats.get("exhausted") and not stats.get("budget_hits")
+        complete = not stats["failed_pages"] and not stats.get("budget_hits") and not stats.get("aborted")
+        return items, hit_cap, complete
+
+    def worker_loop(self, jobs, done):
+        warm = WarmBrowser(headless=self.headless)
+        try:
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                source, price_range = job
+                try:
+                    items, hit_cap, complete = self.crawl_shard(warm, source, price_range)
+                    done.put((source, price_range, items, hit_cap, complete, None))
+                except Exception as e:
+                    done.put((source, price_range, None, False, False, e))
+        finally:
+            warm.close()
+
+    def run(self):
+        """Crawls all shards and returns the merged, deduplicated items as a ResultSet."""
+        started = time.time()
+        jobs, done = queue.Queue(), queue.Queue()
+        threads = [threading.Thread(target=self.worker_loop, args=(jobs, done), name=f"shard-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        pending = 0
+        shards_run = splits = 0
+        for job in self.initial_shards():
+            jobs.put(job)
+            pending += 1
+
+        results = ResultSet()
+        keys = set()
+        duplicates = 0
+        blocked = set()
+        try:
+            while pending:
+                source, price_range, items, hit_cap, complete, error = done.get()
+                pending -= 1
+                shards_run += 1
+                label = format_range(*price_range) if price_range else "all prices"
+                if not complete:
+                    self.partial_sources.add(source_label(source))
+                if isinstance(error, SourceBlocked):
+                    if source not in blocked:
+                        self.logger.warning(f"Skipping remaining {source} shards: {error}")
+                    blocked.add(source)
+                    continue
+                if error is not None:
+                    self.logger.error(f"{source} shard {label} failed: {error}")
+                    continue
+
+                added = 0
+                for item in items:
+                    item["Source"] = source_label(source)
+                    key = item_key(item)
+                    if key in keys:
+                        duplicates += 1
+                        continue
+                    keys.add(key)
+                    results.append(item)
+                    added += 1
+                self.logger.info(f"{source} shard {label}: {len(items)} items, {added} new{' (hit the page cap)' if hit_cap else ''}")
+
+                children = split_shard(*price_range) if hit_cap and price_range else None
+                if children and source not in blocked and shards_run + pending + len(children) <= self.max_shards:
+                    splits += 1
+                    for child in children:
+                        jobs.put((source, child))
+                        pending += 1
+                elif hit_cap:
+                    self.partial_sources.add(source_label(source))
+                    self.logger.warning(f"{source} shard {label} hit the page cap but cannot be split further; results may be incomplete")
+        finally:
+            for _ in threads:
+                jobs.put(None)
+            for thread in threads:
+                thread.join()
+
+        self.logger.info(
+            f"Sharded crawl: {shards_run} shards ({splits} split), {len(results)} unique items, "
+            f"{duplicates} duplicates merged, {time.time() - started:.1f}s"
+        )
+        return results
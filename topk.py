@@ -0,0 +1,77 @@
+import heapq
+import itertools
+import logging
+
+from dataset import parse_price
+from diff import item_key
+from records import ResultSet
+from scraper import source_label
+
+
+class TopK:
+    """
+    Keeps the K cheapest items seen across sources in a bounded max-heap.
+
+    `on_page(source, sorted_by_price, is_ad)` returns a scraper on_page
+    callback that offers each results page to the heap. When the source's
+    results are sorted by ascending price, every later page costs at least as
+    much as the most expensive organic item on this one, so once the heap is
+    full and that price can no longer beat the K-th best, pagination stops.
+    Sponsored items (`is_ad`, usually the scraper's) are still offered but
+    ignored by the stop test, since ads are placed out of price order.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        # (-price, order, item): the root is the most expensive item kept
+        self.heap = []
+        self.keys = set()
+        self.order = itertools.count()
+        self.early_stops = {}
+        self.logger = logging.getLogger(__name__)
+
+    def kth_price(self):
+        """Price an item must beat to get in, or None while fewer than K are kept."""
+        return -self.heap[0][0] if len(self.heap) >= self.k else None
+
+    def offer(self, item):
+        price = parse_price(item.get("Price"))
+        if price is None:
+            return False
+        key = item_key(item)
+        if key in self.keys:
+            return False
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (-price, next(self.order), key, item))
+        elif price < -self.heap[0][0]:
+            _, _, evicted, _ = heapq.heapreplace(self.heap, (-price, next(self.order), key, item))
+            self.keys.discard(evicted)
+        else:
+            return False
+        self.keys.add(key)
+        return True
+
+    def on_page(self, source, sorted_by_price, is_ad=None):
+        label = source_label(source)
+
+        def callback(page_num, items):
+            prices = []
+            for item in items:
+                ad = is_ad is not None and is_ad(item)
+                item = {**item, "Source": label}
+                self.offer(item)
+                price = parse_price(item.get("Price"))
+                if price is not None and not ad:
+                    prices.append(price)
+            threshold = self.kth_price()
+            if sorted_by_price and threshold is not None and prices and max(prices) >= threshold:
+                self.early_stops[source] = page_num
+                self.logger.info(f"{label}: page {page_num} reaches ${max(prices):.2f}, K-th best is ${threshold:.2f}; stopping")
+                return False
+            return True
+
+        return callback
+
+    def results(self):
+        """The kept items, cheapest first."""
+        return ResultSet(item for _, _, _, item in sorted(self.heap, key=lambda entry: (-entry[0], entry[1])))
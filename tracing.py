@@ -0,0 +1,144 @@
+import logging
+import os
+import random
+import time
+import uuid
+
+DEFAULT_ARTIFACT_DIR = "artifacts"
+
+# Set by main.py --trace-sample / --trace-slow / --trace-har
+trace_sample = 0.0
+slow_page_seconds = None
+record_har = False
+artifact_root = DEFAULT_ARTIFACT_DIR
+
+
+def configure(sample=0.0, slow_seconds=None, har=False, root=DEFAULT_ARTIFACT_DIR):
+    global trace_sample, slow_page_seconds, record_har, artifact_root
+    trace_sample = max(0.0, min(float(sample or 0), 1.0))
+    slow_page_seconds = slow_seconds
+    record_har = har
+    artifact_root = root
+
+
+def tracing_enabled():
+    return trace_sample > 0 or slow_page_seconds is not None
+
+
+class PageTracer:
+    """
+    Diagnostic artifacts for one scrape job, written to artifacts/<job id>/.
+
+    With tracing configured, each results page attempt is recorded as a
+    Playwright trace chunk (DOM snapshots, screenshots, network). The chunk
+    is kept if the page was sampled, took longer than the slow threshold or
+    failed, and discarded otherwise. Pages that are neither sampled nor
+    checked for slowness are never recorded, and with tracing off nothing is
+    started at all. Error screenshots go to the same job directory.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{site}-{uuid.uuid4().hex[:6]}"
+        self.job_dir = os.path.join(artifact_root, self.job_id)
+        self.enabled = tracing_enabled()
+        self.context = None
+        self.started = False
+        self.chunk = False
+        self.page_num = None
+        self.sampled = False
+        self.sessions = 0
+        self.session_kept = False
+        self.kept = []
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, name):
+        os.makedirs(self.job_dir, exist_ok=True)
+        return os.path.join(self.job_dir, name)
+
+    def har_path(self):
+        """HAR file for the next browser session. Playwright records HAR per context, so it covers every page in the session."""
+        if not (self.enabled and record_har):
+            return None
+        self.sessions += 1
+        return self.path(f"{self.site}-session{self.sessions}.har")
+
+    def attach(self, context):
+        self.context = context
+        self.started = False
+        self.session_kept = False
+        # A session replaced mid-page (e.g. SSR fallback) keeps recording the same page
+        if self.page_num is not None and (self.sampled or slow_page_seconds is not None):
+            self._start_chunk()
+
+    def _start_chunk(self):
+        try:
+            if not self.started:
+                self.context.tracing.start(screenshots=True, snapshots=True)
+                self.started = True
+            self.context.tracing.start_chunk(title=f"{self.site} page {self.page_num}")
+            self.chunk = True
+        except Exception as e:
+            self.logger.debug(f"Could not start trace for {self.site} page {self.page_num}: {e}")
+
+    def start_page(self, page_num):
+        if not self.enabled or self.context is None:
+            return
+        self.page_num = page_num
+        self.sampled = random.random() < trace_sample
+        if self.sampled or slow_page_seconds is not None:
+            self._start_chunk()
+
+    def finish_page(self, seconds, attempt, failed=False):
+        """Stops the page's chunk, saving it if it was sampled, slow or failed. Returns the trace path or None."""
+        page_num, self.page_num = self.page_num, None
+        if not self.chunk:
+            return None
+        self.chunk = False
+        reason = None
+        if failed:
+            reason = "failed"
+        elif slow_page_seconds is not None and seconds >= slow_page_seconds:
+            reason = "slow"
+        elif self.sampled:
+            reason = "sampled"
+        try:
+            if reason is None:
+                self.context.tracing.stop_chunk()
+                return None
+            path = self.path(f"{self.site}-p{page_num}-a{attempt + 1}-{reason}.zip")
+            self.context.tracing.stop_chunk(path=path)
+        except Exception as e:
+            self.logger.debug(f"Could not stop trace for {self.site} page {page_num}: {e}")
+            return None
+        self.session_kept = True
+        self.kept.append(path)
+        self.logger.info(f"Saved {reason} trace ({seconds:.1f}s) to {path} (open with: playwright show-trace {path})")
+        return path
+
+    def detach(self):
+        """Stops tracing before the session's context closes."""
+        if self.context is None or not self.started:
+            self.context = None
+            return
+        try:
+            if self.chunk:
+                self.context.tracing.stop_chunk()
+            self.context.tracing.stop()
+        except Exception:
+            pass
+        self.chunk = False
+        self.context = None
+
+    def discard_har(self, har_path):
+        """Called after the context has closed (and written its HAR): drops it unless the session kept a trace."""
+        if har_path and not self.session_kept and os.path.exists(har_path):
+            os.remove(har_path)
+
+    def screenshot(self, page, page_num, attempt):
+        try:
+            path = self.path(f"{self.site}-p{page_num}-a{attempt + 1}-error.png")
+            page.screenshot(path=path)
+            return path
+        except Exception:
+            return None
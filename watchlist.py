@@ -0,0 +1,326 @@
+import csv
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_profiles import USER_AGENT
+from block_detector import circuit_breaker, BLOCK_STATUSES, CAPTCHA, DENIED
+from canonical import canonical_url, site_for_url, CANONICAL_URLS
+
+DEFAULT_STATE_FILE = "watchlist.db"
+DEFAULT_CHANGES_FILE = "price_changes.csv"
+
+# Same rate PCHomeScraper uses for search results
+TWD_PER_USD = 32.5
+
+# Price-only extraction: regexes over the raw HTML, no DOM parse. Structured
+# data (JSON-LD / microdata) is tried first, then each site's price markup.
+JSONLD_PRICE = re.compile(r'"price"\s*:\s*"?([\d][\d,]*(?:\.\d+)?)')
+META_PRICE = re.compile(r'itemprop=["\']price["\'][^>]*content=["\']([\d.,]+)|property=["\']product:price:amount["\'][^>]*content=["\']([\d.,]+)')
+SITE_PRICES = {
+    "amazon": re.compile(r'class="a-offscreen">\s*\$([\d,]+\.\d{2})'),
+    "newegg": re.compile(r'class="price-current"[^>]*>.{0,80}?<strong>([\d,]+)</strong><sup>(\.\d{2})', re.DOTALL),
+    "bestbuy": re.compile(r'"currentPrice"\s*:\s*([\d.]+)'),
+    "bh": re.compile(r'data-selenium="pricingPrice"[^>]*>\s*\$([\d,]+\.\d{2})'),
+    "pchome": re.compile(r'"P"\s*:\s*(\d+)'),
+}
+AVAILABILITY = re.compile(r'schema\.org/(InStock|OutOfStock|SoldOut|PreOrder|BackOrder|Discontinued|LimitedAvailability)')
+OUT_OF_STOCK_TEXT = re.compile(r"currently unavailable|out of stock|sold out|售完", re.IGNORECASE)
+BLOCK_MARKERS = re.compile(r"validateCaptcha|px-captcha|g-recaptcha|h-captcha|<title>\s*Robot Check|Access Denied|Pardon Our Interruption", re.IGNORECASE)
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+def parse_entry(entry):
+    """Turns a watchlist line (product URL or site:id) into (site, canonical URL)."""
+    entry = entry.strip()
+    if not entry or entry.startswith("#"):
+        return None
+    if not entry.startswith("http"):
+        site, _, product_id = entry.partition(":")
+        site = site.strip().lower()
+        if site not in CANONICAL_URLS or not product_id.strip():
+            raise ValueError(f"Unrecognised watchlist entry: {entry}")
+        return site, CANONICAL_URLS[site].format(product_id.strip())
+    site = site_for_url(entry)
+    if not site:
+        raise ValueError(f"Unsupported site in watchlist entry: {entry}")
+    return site, canonical_url(entry, site)
+
+
+def load_watchlist(path):
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parsed = parse_entry(line)
+            if parsed:
+                entries.append(parsed)
+    return entries
+
+
+def extract_price(site, html):
+    """Returns (price, stock) from a product page's HTML; either may be None."""
+    price = None
+    match = SITE_PRICES[site].search(html)
+    if match:
+        price = "".join(group for group in match.groups() if group)
+    else:
+        match = JSONLD_PRICE.search(html) or META_PRICE.search(html)
+        if match:
+            price = next(group for group in match.groups() if group)
+
+    if price is not None:
+        try:
+            value = float(price.replace(",", ""))
+            if site == "pchome":
+                value /= TWD_PER_USD
+            price = f"${value:.2f}"
+        except ValueError:
+            price = None
+
+    stock = None
+    availability = AVAILABILITY.search(html)
+    if availability:
+        stock = "In Stock" if availability.group(1) in ("InStock", "LimitedAvailability", "PreOrder", "BackOrder") else "Out of Stock"
+    elif OUT_OF_STOCK_TEXT.search(html):
+        stock = "Out of Stock"
+    elif price is not None:
+        stock = "In Stock"
+    return price, stock
+
+
+class WatchState:
+    """SQLite store of the last known price/stock and HTTP validators per watched product."""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watch ("
+            "url TEXT PRIMARY KEY, site TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "price TEXT, stock TEXT, checked REAL, next_check REAL NOT NULL DEFAULT 0)"
+        )
+        self.conn.commit()
+
+    def sync(self, entries):
+        """Adds new watchlist entries (due immediately) and drops ones no longer listed."""
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO watch (url, site) VALUES (?, ?)", [(url, site) for site, url in entries])
+            urls = [url for _, url in entries]
+            self.conn.execute(f"DELETE FROM watch WHERE url NOT IN ({','.join('?' * len(urls))})", urls)
+            self.conn.commit()
+
+    def due(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, site, etag, last_modified, price, stock FROM watch WHERE next_check <= ? ORDER BY next_check", (now,)
+            ).fetchall()
+        keys = ("url", "site", "etag", "last_modified", "price", "stock")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def next_due(self):
+        with self.lock:
+            row = self.conn.execute("SELECT MIN(next_check) FROM watch").fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def update(self, entry, next_check):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE watch SET etag = ?, last_modified = ?, price = ?, stock = ?, checked = ?, next_check = ? WHERE url = ?",
+                (entry["etag"], entry["last_modified"], entry["price"], entry["stock"], time.time(), next_check, entry["url"]),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class PriceMonitor:
+    """
+    Watchlist mode: re-checks a fixed set of product pages every `interval`
+    seconds instead of running open-ended searches.
+
+    Checks go over plain HTTP with a pooled keep-alive session and
+    conditional requests (If-None-Match / If-Modified-Since), so an
+    unchanged page costs a 304 and no parsing. Pages are read with a
+    price/stock regex rather than a DOM parse. Pages the HTTP path cannot
+    read (bot wall, no price in the static HTML) are retried in a browser
+    once per pass. Only price or stock changes are appended to the changes
+    CSV.
+    """
+
+    def __init__(self, entries, interval=3600, workers=16, headless=True, state=None,
+                 changes_file=DEFAULT_CHANGES_FILE, browser_fallback=True, timeout=15):
+        self.entries = entries
+        self.interval = interval
+        self.workers = workers
+        self.headless = headless
+        self.state = state or WatchState()
+        self.changes_file = changes_file
+        self.browser_fallback = browser_fallback
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(CANONICAL_URLS), pool_maxsize=workers)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self.http.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml",
+            "Accept-Language": "en-US,en;q=0.9",
+        })
+        self.http.cookies.set("i18n-prefs", "USD", domain=".amazon.com")
+
+        self.state.sync(entries)
+
+    def fetch(self, entry):
+        """HTTP fast path. Returns (outcome, html, validators); the caller stores the validators once the page proved readable."""
+        headers = {}
+        # A 304 only means something once a price has been read from the cached version
+        if entry["price"] is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["price"] is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = self.http.get(entry["url"], headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.logger.warning(f"Watch check failed for {entry['url']}: {e}")
+            return FAILED, None, None
+
+        if response.status_code == 304:
+            return UNCHANGED, None, None
+        if response.status_code in BLOCK_STATUSES or BLOCK_MARKERS.search(response.text):
+            return BLOCKED, None, None
+        if response.status_code != 200:
+            return FAILED, None, None
+        return CHANGED, response.text, (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def check(self, entry):
+        """Checks one product over HTTP. Returns (outcome, new price, new stock)."""
+        outcome, html, validators = self.fetch(entry)
+        if outcome != CHANGED:
+            return outcome, entry["price"], entry["stock"]
+        price, stock = extract_price(entry["site"], html)
+        if price is None:
+            # Price is rendered client-side on this page; needs the browser. No validators are kept,
+            # or later passes would get a 304 and never reach the browser again.
+            return BLOCKED, entry["price"], entry["stock"]
+        entry["etag"], entry["last_modified"] = validators
+        return CHANGED, price, stock
+
+    def record(self, entry, price, stock, writer):
+        if entry["price"] is not None and (price, stock) != (entry["price"], entry["stock"]):
+            writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), entry["site"], entry["url"], entry["price"], price, entry["stock"], stock])
+            self.logger.info(f"{entry['url']}: {entry['price']} ({entry['stock']}) -> {price} ({stock})")
+            changed = True
+        else:
+            changed = False
+        entry["price"], entry["stock"] = price, stock
+        return changed
+
+    def run_once(self):
+        """Checks every due product once. Returns the pass statistics."""
+        due = self.state.due()
+        if not due:
+            return {}
+        started = time.time()
+        stats = {UNCHANGED: 0, CHANGED: 0, BLOCKED: 0, FAILED: 0, "price_changes": 0}
+        next_check = started + self.interval
+
+        # Sites with an open circuit breaker wait for the next pass
+        skipped = [entry for entry in due if not circuit_breaker.allow(entry["site"])]
+        due = [entry for entry in due if circuit_breaker.allow(entry["site"])]
+
+        new_file = not os.path.exists(self.changes_file)
+        with open(self.changes_file, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["Checked", "Source", "Product Link", "Old Price", "New Price", "Old Stock", "New Stock"])
+
+            browser_queue = []
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for entry, (outcome, price, stock) in zip(due, pool.map(self.check, due)):
+                    stats[outcome] += 1
+                    if outcome == BLOCKED:
+                        browser_queue.append(entry)
+                        continue
+                    if outcome == CHANGED:
+                        stats["price_changes"] += self.record(entry, price, stock, writer)
+
+            if browser_queue and self.browser_fallback:
+                stats["price_changes"] += self.check_in_browser(browser_queue, writer)
+
+        # Failed checks wait for the next interval too rather than spinning
+        for entry in due:
+            self.state.update(entry, next_check)
+
+        for entry in skipped:
+            self.state.update(entry, time.time() + circuit_breaker.remaining(entry["site"]))
+
+        elapsed = time.time() - started
+        checks = len(due)
+        rate = checks / elapsed * 3600 if elapsed > 0 else 0.0
+        self.logger.info(
+            f"Watch pass: {checks} checked ({stats[UNCHANGED]} not modified, {stats[CHANGED]} fetched, "
+            f"{stats[BLOCKED]} via browser, {stats[FAILED]} failed, {len(skipped)} skipped), "
+            f"{stats['price_changes']} price/stock changes in {elapsed:.1f}s ({rate:.0f} checks/hour)"
+        )
+        return stats
+
+    def check_in_browser(self, entries, writer):
+        """Slow path for pages the HTTP check could not read, one warm session per site."""
+        from playwright.sync_api import sync_playwright
+        from browser_profiles import BrowserSession
+
+        changes = 0
+        by_site = {}
+        for entry in entries:
+            by_site.setdefault(entry["site"], []).append(entry)
+
+        with sync_playwright() as p:
+            for site, site_entries in by_site.items():
+                session = BrowserSession(p, site, headless=self.headless)
+                page = session.context.new_page()
+                try:
+                    for entry in site_entries:
+                        try:
+                            page.goto(entry["url"], timeout=self.timeout * 1000, wait_until="domcontentloaded")
+                            html = page.content()
+                        except Exception as e:
+                            self.logger.warning(f"Browser check failed for {entry['url']}: {e}")
+                            continue
+                        if BLOCK_MARKERS.search(html):
+                            circuit_breaker.record_block(site, CAPTCHA if "captcha" in html.lower() else DENIED)
+                            self.logger.warning(f"{site} blocked the browser check; leaving the rest for the next pass")
+                            break
+                        price, stock = extract_price(site, html)
+                        if price is not None:
+                            circuit_breaker.record_success(site)
+                            changes += self.record(entry, price, stock, writer)
+                finally:
+                    session.close()
+        return changes
+
+    def run(self, once=False):
+        """Runs passes until interrupted, sleeping until the next product is due."""
+        while True:
+            self.run_once()
+            if once:
+                return
+            next_due = self.state.next_due()
+            delay = max(1.0, (next_due or time.time() + self.interval) - time.time())
+            self.logger.info(f"Next watch check in {delay:.0f}s")
+            time.sleep(delay)